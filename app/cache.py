@@ -0,0 +1,212 @@
+import json
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any
+from app.config import settings
+
+
+class TTLCache:
+    """Bounded LRU mapping whose entries expire after ``ttl`` seconds (never when ``ttl`` is None)."""
+
+    def __init__(self, maxsize: int, ttl: float | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+
+    def get(self, key, default=None):
+        item = self._data.get(key)
+        if item is None:
+            return default
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value, ttl: float | None = None):
+        ttl = self.ttl if ttl is None else ttl
+        self._data[key] = (value, time.monotonic() + ttl if ttl is not None else None)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        item = self._data.pop(key, None)
+        return default if item is None else item[0]
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class CacheBackend(ABC):
+    @abstractmethod
+    async def get(self, key: str) -> Any | None:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: int) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, *keys: str) -> None:
+        ...
+
+    @abstractmethod
+    async def incr(self, key: str) -> int:
+        ...
+
+    @abstractmethod
+    async def counter(self, key: str) -> int:
+        ...
+
+    @abstractmethod
+    async def clear(self) -> None:
+        ...
+
+
+class NullCacheBackend(CacheBackend):
+    async def get(self, key: str) -> Any | None:
+        return None
+
+    async def set(self, key: str, value: Any, ttl: int) -> None:
+        pass
+
+    async def delete(self, *keys: str) -> None:
+        pass
+
+    async def incr(self, key: str) -> int:
+        return 0
+
+    async def counter(self, key: str) -> int:
+        return 0
+
+    async def clear(self) -> None:
+        pass
+
+
+class MemoryCacheBackend(CacheBackend):
+    """In-process LRU+TTL store. Values are shared with callers, who must not mutate them."""
+
+    def __init__(self, maxsize: int):
+        self._entries = TTLCache(maxsize)
+        # counters live outside the LRU so that eviction can never reset a generation
+        self._counters: dict[str, int] = {}
+
+    async def get(self, key: str) -> Any | None:
+        return self._entries.get(key)
+
+    async def set(self, key: str, value: Any, ttl: int) -> None:
+        self._entries.set(key, value, ttl)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._entries.pop(key)
+
+    async def incr(self, key: str) -> int:
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+
+    async def counter(self, key: str) -> int:
+        return self._counters.get(key, 0)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+        self._counters.clear()
+
+
+class RedisCacheBackend(CacheBackend):
+    """Out-of-process store shared by all workers; needs the optional ``redis`` package."""
+
+    def __init__(self, url: str, prefix: str = "bms:"):
+        try:
+            from redis import asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("cache_backend=redis requires the 'redis' package") from e
+        self._client = redis.from_url(url)
+        self._prefix = prefix
+
+    async def get(self, key: str) -> Any | None:
+        raw = await self._client.get(self._prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    async def set(self, key: str, value: Any, ttl: int) -> None:
+        await self._client.set(self._prefix + key, json.dumps(value), ex=ttl)
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self._client.delete(*(self._prefix + key for key in keys))
+
+    async def incr(self, key: str) -> int:
+        return await self._client.incr(self._prefix + key)
+
+    async def counter(self, key: str) -> int:
+        return int(await self._client.get(self._prefix + key) or 0)
+
+    async def clear(self) -> None:
+        async for key in self._client.scan_iter(match=self._prefix + "*"):
+            await self._client.delete(key)
+
+
+# set while serving a client that must see its own recent writes; lookups miss and go to the database
+bypass_reads: ContextVar[bool] = ContextVar("bypass_reads", default=False)
+
+
+class Cache:
+    def __init__(self, backend: CacheBackend, ttl: int):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def get(self, key: str) -> Any | None:
+        value = None if bypass_reads.get() else await self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: Any, ttl: int | None = None) -> None:
+        await self.backend.set(key, value, ttl or self.ttl)
+
+    async def delete(self, *keys: str) -> None:
+        self.invalidations += len(keys)
+        await self.backend.delete(*keys)
+
+    async def generation(self, name: str) -> int:
+        return await self.backend.counter(f"gen:{name}")
+
+    async def bump(self, name: str) -> int:
+        self.invalidations += 1
+        return await self.backend.incr(f"gen:{name}")
+
+    async def clear(self) -> None:
+        await self.backend.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+
+def build_cache_backend(backend: str) -> CacheBackend:
+    if backend == "memory":
+        return MemoryCacheBackend(settings.cache_max_entries)
+    if backend == "redis":
+        return RedisCacheBackend(settings.cache_url or "redis://localhost:6379/0")
+    return NullCacheBackend()
+
+
+cache = Cache(build_cache_backend(settings.cache_backend), ttl=settings.cache_ttl)
@@ -5,6 +5,52 @@ class Settings(BaseSettings):
     jwt_secret: str
     jwt_algorithm: str
     jwt_expiration: int
+    # comma-separated; when set, GET routes read from these and writes stay on database_url
+    database_replica_urls: str = ""
+    read_your_writes_seconds: int = 5
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = 1800
+    # pre-ping costs a round trip on every checkout; pool_recycle retires connections before server-side
+    # idle timeouts, and a connection that fails anyway is invalidated together with the rest of the pool.
+    # Turn it on only where connections are dropped unpredictably (e.g. failovers, aggressive proxies)
+    db_pool_pre_ping: bool = False
+    # set to 0 behind pgbouncer in transaction pooling mode
+    db_prepared_statement_cache_size: int = 100
+    db_statement_timeout_ms: int | None = None
+    # staging: record every request's SQL and log N+1 patterns and requests over the budget
+    query_budget_enabled: bool = False
+    query_budget_per_request: int | None = None
+    query_budget_repeat_threshold: int = 3
+    rate_limit_enabled: bool = True
+    # memory (per worker), sqlite (shared by the workers on one host) or redis (shared by all hosts)
+    rate_limit_store: str = "memory"
+    # SQLite file path or Redis URL for the shared stores
+    rate_limit_url: str | None = None
+    rate_limit_max_keys: int = 100000
+    # comma-separated per-route overrides, e.g. "list_books=100/minute burst=20"
+    rate_limits: str = ""
+    # proxies in front of the app that append to X-Forwarded-For; 0 keys anonymous clients on the peer address
+    rate_limit_trusted_proxies: int = 0
+    # book reads (list, single, batch get) write service rows straight to JSON instead of validating them via BookOut
+    fast_responses: bool = True
+    # include_total=cached keeps per-filter counts this long, on top of the invalidation by writes
+    total_count_cache_ttl: int = 60
+    # include_total=estimated counts exactly when the planner expects fewer rows than this
+    total_count_estimate_threshold: int = 1000
+    import_batch_size: int = 500
+    import_chunk_size: int = 64 * 1024
+    export_batch_size: int = 1000
+    cache_backend: str = "memory"
+    cache_url: str | None = None
+    cache_ttl: int = 30
+    cache_max_entries: int = 10000
+    author_cache_size: int = 10000
+    principal_cache_ttl: int = 300
+    principal_cache_size: int = 10000
+    password_hash_workers: int = 2
+    password_hash_max_pending: int = 64
 
     class Config:
         env_file = Path(__file__).resolve().parent.parent/".env"
@@ -1,11 +1,169 @@
+import itertools
+import time
+from contextlib import asynccontextmanager
+from functools import partial
+from fastapi import Request, Response
+from sqlalchemy import event
+from sqlalchemy.engine import make_url, URL
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
 from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlalchemy.pool import QueuePool
+from app.cache import bypass_reads
 from app.config import settings
+from app.metrics import instrument_engine
+from app.query_budget import watch_engine
 
-engine: AsyncEngine = create_async_engine(settings.database_url, future=True, echo=False)
+
+def enable_sqlite_foreign_keys(engine: AsyncEngine):
+    # SQLite ignores FOREIGN KEY clauses, including ON DELETE CASCADE, unless asked per connection
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _on_connect(dbapi_conn, connection_record):
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
+def engine_options(database_url: str) -> tuple[URL, dict]:
+    url = make_url(database_url)
+    options: dict = {"future": True, "echo": False}
+    # in-memory SQLite runs on a single static connection, pool sizing does not apply
+    if url.get_backend_name() != "sqlite" or url.database not in (None, "", ":memory:"):
+        options.update(
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+            pool_pre_ping=settings.db_pool_pre_ping,
+        )
+    if url.get_driver_name() == "asyncpg":
+        url = url.update_query_dict({"prepared_statement_cache_size": str(settings.db_prepared_statement_cache_size)})
+        if settings.db_statement_timeout_ms:
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(settings.db_statement_timeout_ms)}}
+    return url, options
+
+
+def build_engine(database_url: str) -> AsyncEngine:
+    url, options = engine_options(database_url)
+    engine = create_async_engine(url, **options)
+    enable_sqlite_foreign_keys(engine)
+    instrument_engine(engine)
+    watch_engine(engine)
+    return engine
+
+
+class PoolMonitor:
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    @asynccontextmanager
+    async def connect(self):
+        started = time.perf_counter()
+        try:
+            conn = await self.engine.connect()
+        except PoolTimeoutError:
+            self.timeouts += 1
+            raise
+        wait = time.perf_counter() - started
+        self.checkouts += 1
+        self.wait_seconds += wait
+        self.max_wait_seconds = max(self.max_wait_seconds, wait)
+        try:
+            yield conn
+        finally:
+            await conn.close()
+
+    def stats(self) -> dict:
+        pool = self.engine.pool
+        stats: dict = {"pool": type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            stats.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                checked_in=pool.checkedin(),
+                overflow=pool.overflow(),
+                max_overflow=pool._max_overflow,
+            )
+        stats.update(
+            checkouts=self.checkouts,
+            timeouts=self.timeouts,
+            avg_wait_ms=round(self.wait_seconds / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            max_wait_ms=round(self.max_wait_seconds * 1000, 3),
+        )
+        return stats
+
+
+engine: AsyncEngine = build_engine(settings.database_url)
+pool_monitor = PoolMonitor(engine)
+replica_monitors = [
+    PoolMonitor(build_engine(url.strip())) for url in settings.database_replica_urls.split(",") if url.strip()
+]
+_replica_turn = itertools.count()
+
+READ_YOUR_WRITES_COOKIE = "bms_primary_until"
+
+
+def mark_recent_write(response: Response):
+    """Route dependency for endpoints that change data: the client reads from the primary for a while.
+
+    The cookie is set on the route's response, so a request that fails with an error does not get it.
+    """
+    if replica_monitors:
+        until = int(time.time()) + settings.read_your_writes_seconds
+        response.set_cookie(
+            READ_YOUR_WRITES_COOKIE, str(until), max_age=settings.read_your_writes_seconds, httponly=True
+        )
+
+
+def wrote_recently(request: Request) -> bool:
+    try:
+        return int(request.cookies.get(READ_YOUR_WRITES_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
 
 
 async def get_conn():
-    async with engine.connect() as conn:
+    async with pool_monitor.connect() as conn:
+        yield conn
+
+
+@asynccontextmanager
+async def read_connection(request: Request):
+    if not replica_monitors:
+        async with pool_monitor.connect() as conn:
+            yield conn
+        return
+    if not wrote_recently(request):
+        monitor = replica_monitors[next(_replica_turn) % len(replica_monitors)]
+        async with monitor.connect() as conn:
+            yield conn
+        return
+    # the client wrote within the window: read from the primary, and past the shared cache,
+    # which may hold rows another request read from a lagging replica
+    token = bypass_reads.set(True)
+    try:
+        async with pool_monitor.connect() as conn:
+            yield conn
+    finally:
+        bypass_reads.reset(token)
+
+
+async def get_read_conn(request: Request):
+    async with read_connection(request) as conn:
         yield conn
 
+
+def get_read_connector(request: Request):
+    """Opens read connections later, for response bodies that are streamed after the endpoint returns.
+
+    Depending on the FastAPI version, yield dependencies may be closed before a StreamingResponse
+    runs, so a connection from ``get_read_conn`` cannot be used by the body generator.
+    """
+    return partial(read_connection, request)
@@ -1,10 +1,17 @@
 from fastapi import status
 
 class AppError(Exception):
-    def __init__(self, message: str, status_code: int = status.HTTP_400_BAD_REQUEST, details: dict | None = None):
+    def __init__(
+            self,
+            message: str,
+            status_code: int = status.HTTP_400_BAD_REQUEST,
+            details: dict | None = None,
+            headers: dict | None = None
+    ):
         self.message = message
         self.status_code = status_code
         self.details = details or {}
+        self.headers = headers
 
 
 class NotFoundError(AppError):
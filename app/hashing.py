@@ -0,0 +1,86 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import status
+from app.config import settings
+from app.errors import AppError
+
+
+class PasswordHasher:
+    """Runs bcrypt on a bounded thread pool so that hashing never blocks the event loop.
+
+    bcrypt releases the GIL, so ``workers`` threads hash in parallel; calls beyond
+    ``max_pending`` (running + queued) are rejected with 503 instead of queueing forever.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.run_seconds = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    def _timed(self, fn, args: tuple, queued_at: float):
+        started = time.perf_counter()
+        wait = started - queued_at
+        with self._lock:
+            self.running += 1
+            self.wait_seconds += wait
+            self.max_wait_seconds = max(self.max_wait_seconds, wait)
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.run_seconds += time.perf_counter() - started
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise AppError(
+                    "Too many concurrent authentication requests",
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE
+                )
+            self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), self._timed, fn, args, time.perf_counter())
+        finally:
+            with self._lock:
+                self.pending -= 1
+                self.completed += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "running": self.running,
+                "queued": self.pending - self.running,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(self.wait_seconds / self.completed * 1000, 3) if self.completed else 0.0,
+                "max_wait_ms": round(self.max_wait_seconds * 1000, 3),
+                "avg_run_ms": round(self.run_seconds / self.completed * 1000, 3) if self.completed else 0.0,
+            }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(settings.password_hash_workers, settings.password_hash_max_pending)
@@ -1,4 +1,319 @@
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+import asyncio
+import logging
+import math
+import re
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from fastapi import Request, Response, status
+from jose import JWTError
+from app.cache import TTLCache
+from app.config import settings
+from app.errors import AppError
+from app.metrics import rate_limit_rejections
+from app.services.auth_service import cached_username, decode_token
 
-limiter = Limiter(key_func=get_remote_address)
+logger = logging.getLogger(__name__)
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+_RATE = re.compile(r"^\s*(\d+)\s*/\s*(second|minute|hour|day)s?\s*(?:burst\s*=\s*(\d+))?\s*$")
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """``count`` requests per ``period`` seconds, refilled continuously; up to ``burst`` may be spent at once."""
+
+    count: int
+    period: int
+    burst: int
+
+    @property
+    def rate(self) -> float:
+        return self.count / self.period
+
+    def __str__(self) -> str:
+        period = next(name for name, seconds in _PERIODS.items() if seconds == self.period)
+        return f"{self.count}/{period}" + (f" burst={self.burst}" if self.burst != self.count else "")
+
+
+def parse_rate(value: str) -> RateLimit:
+    match = _RATE.match(value)
+    if not match:
+        raise ValueError(f"invalid rate limit {value!r}, expected e.g. '20/minute' or '20/minute burst=5'")
+    count, period, burst = match.groups()
+    return RateLimit(int(count), _PERIODS[period], int(burst) if burst else int(count))
+
+
+def parse_rate_overrides(value: str) -> dict[str, RateLimit]:
+    overrides = {}
+    for part in filter(None, (p.strip() for p in value.split(","))):
+        name, _, rate = part.partition("=")
+        overrides[name.strip()] = parse_rate(rate)
+    return overrides
+
+
+class RateLimitStore(ABC):
+    """Token buckets keyed by client; ``take`` spends ``cost`` tokens if available and returns (allowed, tokens left)."""
+
+    @abstractmethod
+    async def take(self, key: str, rate: float, capacity: float, cost: float = 1.0) -> tuple[bool, float]:
+        ...
+
+    @abstractmethod
+    async def reset(self) -> None:
+        ...
+
+
+class MemoryRateLimitStore(RateLimitStore):
+    """Per-process buckets. Exact for a single worker, and the stand-in for the shared stores in tests."""
+
+    def __init__(self, maxsize: int):
+        self._buckets = TTLCache(maxsize)
+
+    async def take(self, key: str, rate: float, capacity: float, cost: float = 1.0) -> tuple[bool, float]:
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        tokens = capacity if bucket is None else min(capacity, bucket[0] + (now - bucket[1]) * rate)
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        # a bucket that has refilled completely is the same as a missing one, so it can expire then
+        self._buckets.set(key, (tokens, now), (capacity - tokens) / rate + 1)
+        return allowed, tokens
+
+    async def reset(self) -> None:
+        self._buckets.clear()
+
+
+class SQLiteRateLimitStore(RateLimitStore):
+    """Buckets in a local SQLite file shared by every worker on the host.
+
+    Each decision is one upsert in autocommit mode, which SQLite serialises across processes. It runs on a
+    worker thread, and a decision that cannot get the write lock quickly is made on per-process buckets.
+    Every ``prune_every`` decisions the buckets that have refilled completely are deleted, as a missing
+    bucket is the same as a full one.
+    """
+
+    def __init__(self, path: str, prune_every: int = 1000):
+        self._conn = sqlite3.connect(path, timeout=0.05, isolation_level=None, check_same_thread=False)
+        # one statement at a time on the shared connection, whichever thread runs it
+        self._lock = threading.Lock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(rate_limit_buckets)")}
+        if columns and "capacity" not in columns:
+            # buckets are disposable, a table from before pruning is simply replaced
+            self._conn.execute("DROP TABLE rate_limit_buckets")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit_buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, "
+            "ts REAL NOT NULL, allowed INTEGER NOT NULL, rate REAL NOT NULL, capacity REAL NOT NULL) WITHOUT ROWID"
+        )
+        self._prune_every = prune_every
+        self._decisions = 0
+        self._fallback = MemoryRateLimitStore(settings.rate_limit_max_keys)
+
+    def _take(self, params: dict) -> tuple:
+        with self._lock:
+            # SET expressions all see the old row, so the refilled level is recomputed in each of them
+            row = self._conn.execute(
+                """
+                INSERT INTO rate_limit_buckets (key, tokens, ts, allowed, rate, capacity)
+                VALUES (:key, CASE WHEN :capacity >= :cost THEN :capacity - :cost ELSE :capacity END, :now,
+                        :capacity >= :cost, :rate, :capacity)
+                ON CONFLICT (key) DO UPDATE SET
+                    tokens = min(:capacity, tokens + max(0, :now - ts) * :rate)
+                        - CASE WHEN min(:capacity, tokens + max(0, :now - ts) * :rate) >= :cost THEN :cost ELSE 0 END,
+                    allowed = min(:capacity, tokens + max(0, :now - ts) * :rate) >= :cost,
+                    ts = max(ts, :now),
+                    rate = :rate,
+                    capacity = :capacity
+                RETURNING allowed, tokens
+                """,
+                params,
+            ).fetchone()
+            self._decisions += 1
+            if self._decisions % self._prune_every == 0:
+                self._prune(params["now"])
+        return row
+
+    def _prune(self, now: float) -> int:
+        return self._conn.execute(
+            "DELETE FROM rate_limit_buckets WHERE tokens + max(0, :now - ts) * rate >= capacity", {"now": now}
+        ).rowcount
+
+    async def take(self, key: str, rate: float, capacity: float, cost: float = 1.0) -> tuple[bool, float]:
+        params = {"key": key, "rate": rate, "capacity": capacity, "cost": cost, "now": time.time()}
+        try:
+            row = await asyncio.to_thread(self._take, params)
+        except sqlite3.OperationalError as e:
+            logger.warning("Rate limit store busy, using local buckets: %s", e)
+            return await self._fallback.take(key, rate, capacity, cost)
+        return bool(row[0]), row[1]
+
+    async def reset(self) -> None:
+        def delete_all():
+            with self._lock:
+                self._conn.execute("DELETE FROM rate_limit_buckets")
+
+        await asyncio.to_thread(delete_all)
+        await self._fallback.reset()
+
+
+_REDIS_TAKE = """
+local rate, capacity, cost = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000)
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisRateLimitStore(RateLimitStore):
+    """Buckets on a Redis server shared by all workers and hosts; needs the optional ``redis`` package.
+
+    While the server is unreachable, decisions fall back to per-process buckets instead of failing requests.
+    """
+
+    def __init__(self, url: str, prefix: str = "bms:rl:"):
+        try:
+            from redis import asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("rate_limit_store=redis requires the 'redis' package") from e
+        self._client = redis.from_url(url)
+        self._script = self._client.register_script(_REDIS_TAKE)
+        self._prefix = prefix
+        self._fallback = MemoryRateLimitStore(settings.rate_limit_max_keys)
+
+    async def take(self, key: str, rate: float, capacity: float, cost: float = 1.0) -> tuple[bool, float]:
+        try:
+            allowed, tokens = await self._script(keys=[self._prefix + key], args=[rate, capacity, cost])
+        except Exception as e:
+            logger.warning("Rate limit store unavailable, using local buckets: %s", e)
+            return await self._fallback.take(key, rate, capacity, cost)
+        return bool(allowed), float(tokens)
+
+    async def reset(self) -> None:
+        async for key in self._client.scan_iter(match=self._prefix + "*"):
+            await self._client.delete(key)
+        await self._fallback.reset()
+
+
+def client_ip(request: Request) -> str:
+    # with N trusted proxies in front, the client is the N-th address from the right of X-Forwarded-For
+    hops = settings.rate_limit_trusted_proxies
+    if hops:
+        forwarded = [a.strip() for a in request.headers.get("x-forwarded-for", "").split(",") if a.strip()]
+        if len(forwarded) >= hops:
+            return forwarded[-hops]
+    return request.client.host if request.client else "unknown"
+
+
+def client_key(request: Request) -> str:
+    """Authenticated clients get a bucket per user, everyone else one per address."""
+    authorization = request.headers.get("authorization", "")
+    if authorization[:7].lower() == "bearer ":
+        token = authorization[7:]
+        username = cached_username(token)
+        if username is None:
+            try:
+                username = decode_token(token).get("sub")
+            except JWTError:
+                username = None
+        if username:
+            return "user:" + username
+    return "ip:" + client_ip(request)
+
+
+@dataclass
+class RateLimitDecision:
+    allowed: bool
+    limit: RateLimit
+    remaining: float
+
+    def headers(self, cost: float = 1.0) -> dict[str, str]:
+        headers = {
+            "X-RateLimit-Limit": str(self.limit.burst),
+            "X-RateLimit-Remaining": str(int(self.remaining)),
+            "X-RateLimit-Reset": str(math.ceil((self.limit.burst - self.remaining) / self.limit.rate)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(math.ceil((cost - self.remaining) / self.limit.rate))
+        return headers
+
+
+class RateLimiter:
+    def __init__(self, store: RateLimitStore, key_func=client_key, overrides: dict | None = None, enabled: bool = True):
+        self.store = store
+        self.key_func = key_func
+        self.overrides = overrides or {}
+        self.enabled = enabled
+        self.decisions = 0
+        self.rejected = 0
+        self._decision_time = 0.0
+
+    async def hit(self, scope: str, key: str, limit: RateLimit, cost: float = 1.0) -> RateLimitDecision:
+        started = time.perf_counter()
+        allowed, remaining = await self.store.take(f"{scope}:{key}", limit.rate, limit.burst, cost)
+        self._decision_time += time.perf_counter() - started
+        self.decisions += 1
+        if not allowed:
+            self.rejected += 1
+        return RateLimitDecision(allowed, limit, remaining)
+
+    def limit(self, scope: str, default: str):
+        """Dependency enforcing ``default`` on a route, unless ``settings.rate_limits`` overrides ``scope``."""
+        default_limit = parse_rate(default)
+
+        async def dependency(request: Request, response: Response):
+            if not self.enabled:
+                return
+            decision = await self.hit(scope, self.key_func(request), self.overrides.get(scope, default_limit))
+            if not decision.allowed:
+                route = request.scope.get("route")
+                rate_limit_rejections.inc((route.path if route is not None else request.url.path,))
+                raise AppError(
+                    message="Rate limit exceeded",
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    details={"limit": str(decision.limit)},
+                    headers=decision.headers(),
+                )
+            response.headers.update(decision.headers())
+
+        return dependency
+
+    def stats(self) -> dict:
+        return {
+            "store": type(self.store).__name__,
+            "enabled": self.enabled,
+            "decisions": self.decisions,
+            "rejected": self.rejected,
+            "avg_decision_us": round(self._decision_time / self.decisions * 1e6, 1) if self.decisions else 0.0,
+            "limits": {scope: str(limit) for scope, limit in self.overrides.items()},
+        }
+
+
+def build_rate_limit_store(store: str) -> RateLimitStore:
+    if store == "sqlite":
+        return SQLiteRateLimitStore(settings.rate_limit_url or "rate_limits.db")
+    if store == "redis":
+        return RedisRateLimitStore(settings.rate_limit_url or "redis://localhost:6379/0")
+    return MemoryRateLimitStore(settings.rate_limit_max_keys)
+
+
+limiter = RateLimiter(
+    build_rate_limit_store(settings.rate_limit_store),
+    overrides=parse_rate_overrides(settings.rate_limits),
+    enabled=settings.rate_limit_enabled,
+)
@@ -1,11 +1,15 @@
 from fastapi import FastAPI
 from app import models
-from app.db import engine
-from app.routers import books, auth
+from app.db import engine, pool_monitor, replica_monitors
+from app.routers import authors, books, auth, system
 import logging
 from fastapi import Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from app.errors import AppError
+from app.hashing import password_hasher
+from app.metrics import MetricsMiddleware, registry, track_pools
+from app.query_budget import QueryBudgetMiddleware
+from app.config import settings
 from pathlib import Path
 
 description_file = Path(__file__).parent / "description.md"
@@ -18,6 +22,17 @@ app = FastAPI(
 )
 
 
+app.add_middleware(MetricsMiddleware)
+if settings.query_budget_enabled:
+    app.add_middleware(QueryBudgetMiddleware)
+track_pools(lambda: {"primary": pool_monitor, **{f"replica{i}": m for i, m in enumerate(replica_monitors)}})
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.exception_handler(AppError)
 async def app_error_handler(request: Request, exc: AppError):
     logging.error(f"AppError: {exc.message} | Path: {request.url.path}")
@@ -27,7 +42,8 @@ async def app_error_handler(request: Request, exc: AppError):
             "error": exc.message,
             "details": exc.details,
             "path": str(request.url.path)
-        }
+        },
+        headers=exc.headers
     )
 
 
@@ -54,5 +70,12 @@ async def on_startup():
     await init_models()
 
 
+@app.on_event("shutdown")
+async def on_shutdown():
+    password_hasher.shutdown()
+
+
 app.include_router(auth.router)
 app.include_router(books.router)
+app.include_router(authors.router)
+app.include_router(system.router)
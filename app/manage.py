@@ -0,0 +1,57 @@
+"""Maintenance commands.
+
+    python -m app.manage backfill-authors [--all] [--batch-size N]
+    python -m app.manage check-authors [--repair] [--batch-size N]
+    python -m app.manage recompute-facets
+"""
+import argparse
+import asyncio
+import json
+import sys
+from app.db import engine
+from app.services import book_service
+
+
+async def backfill_authors(args) -> int:
+    async with engine.connect() as conn:
+        count = await book_service.backfill_authors_json(conn, args.batch_size, only_missing=not args.all)
+    print(f"backfilled authors_json on {count} books")
+    return 0
+
+
+async def check_authors(args) -> int:
+    async with engine.connect() as conn:
+        result = await book_service.check_authors_json(conn, repair=args.repair, batch_size=args.batch_size)
+    print(json.dumps(result))
+    # non-zero while the copy is out of sync, so the check can gate a deploy or a cron alert
+    return 0 if args.repair or not (result["missing"] or result["mismatched"]) else 1
+
+
+async def recompute_facets(args) -> int:
+    async with engine.connect() as conn:
+        result = await book_service.recompute_facets(conn)
+    print(json.dumps(result))
+    return 0
+
+
+COMMANDS = {"backfill-authors": backfill_authors, "check-authors": check_authors, "recompute-facets": recompute_facets}
+
+
+async def main(args) -> int:
+    try:
+        return await COMMANDS[args.command](args)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Book Management System maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+    backfill = commands.add_parser("backfill-authors", help="fill books.authors_json from book_authors")
+    backfill.add_argument("--all", action="store_true", help="rewrite every row, not only the missing ones")
+    backfill.add_argument("--batch-size", type=int)
+    check = commands.add_parser("check-authors", help="compare books.authors_json with book_authors")
+    check.add_argument("--repair", action="store_true", help="rewrite the rows that are missing or differ")
+    check.add_argument("--batch-size", type=int)
+    commands.add_parser("recompute-facets", help="rebuild the facet counters behind GET /books/stats")
+    sys.exit(asyncio.run(main(parser.parse_args())))
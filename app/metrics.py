@@ -0,0 +1,203 @@
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Iterable
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: tuple = ()) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # per label set: one count per bucket plus +Inf, then sum
+        self._values: dict[tuple, list] = {}
+
+    def observe(self, labels: tuple, value: float):
+        series = self._values.get(labels)
+        if series is None:
+            series = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def count(self, labels: tuple = ()) -> int:
+        series = self._values.get(labels)
+        return sum(series[0]) if series else 0
+
+    def samples(self) -> Iterable[str]:
+        names = self.labelnames + ("le",)
+        for labels, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                yield f"{self.name}_bucket{_format_labels(names, labels + (le,))} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}"
+
+
+class GaugeFunc:
+    """Gauge whose samples are read from ``collect`` at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: tuple, collect: Callable[[], Iterable[tuple]]):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.collect = collect
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in self.collect():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, object] = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+http_requests = registry.register(Counter(
+    "bms_http_requests_total", "HTTP requests by route and status.", ("method", "route", "status")
+))
+http_latency = registry.register(Histogram(
+    "bms_http_request_duration_seconds", "HTTP request latency.", ("method", "route")
+))
+request_statements = registry.register(Histogram(
+    "bms_db_statements_per_request", "SQL statements executed per HTTP request.", ("method", "route"),
+    buckets=STATEMENT_BUCKETS
+))
+request_db_time = registry.register(Histogram(
+    "bms_db_time_per_request_seconds", "Time spent in SQL statements per HTTP request.", ("method", "route")
+))
+rate_limit_rejections = registry.register(Counter(
+    "bms_rate_limit_rejections_total", "Requests rejected by the rate limiter.", ("route",)
+))
+
+
+class SqlStats:
+    __slots__ = ("statements", "seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+
+
+# per-request accumulator; the object is shared with the tasks the request spawns, so it is mutated in place
+current_sql_stats: ContextVar[SqlStats | None] = ContextVar("current_sql_stats", default=None)
+
+
+def instrument_engine(engine: AsyncEngine):
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._bms_started = time.perf_counter()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        stats = current_sql_stats.get()
+        if stats is not None and context is not None:
+            stats.statements += 1
+            stats.seconds += time.perf_counter() - getattr(context, "_bms_started", time.perf_counter())
+
+
+def track_pools(monitors: Callable[[], dict]):
+    def collect(field: str):
+        return lambda: (((name,), m.stats().get(field, 0)) for name, m in monitors().items())
+
+    for field, help in (
+        ("checked_out", "Connections currently checked out."),
+        ("overflow", "Connections opened beyond pool_size."),
+        ("size", "Configured pool size."),
+        ("checkouts", "Connections handed out since start."),
+        ("timeouts", "Checkouts that timed out waiting for the pool."),
+        ("max_wait_ms", "Longest checkout wait since start, in milliseconds."),
+    ):
+        registry.register(GaugeFunc(f"bms_db_pool_{field}", help, ("engine",), collect(field)))
+
+
+class MetricsMiddleware:
+    """Plain ASGI middleware, so that timing a request costs two clock reads and a few dict updates."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        stats = SqlStats()
+        token = current_sql_stats.set(stats)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_sql_stats.reset(token)
+            route = scope.get("route")
+            labels = (scope["method"], route.path if route is not None else "unmatched")
+            http_requests.inc(labels + (str(status_code),))
+            http_latency.observe(labels, time.perf_counter() - started)
+            request_statements.observe(labels, stats.statements)
+            request_db_time.observe(labels, stats.seconds)
@@ -1,14 +1,29 @@
-from sqlalchemy import Column, Table, ForeignKey, String, Integer, Boolean
+from sqlalchemy import Column, Table, ForeignKey, String, Integer, Boolean, DateTime, Index, Text, JSON, DDL, event, func
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import declarative_base, relationship
 from sqlalchemy.types import Enum as SQLEnum
 from app.schemas.book_schema import Genre
 
 Base = declarative_base()
 
+event.listen(
+    Base.metadata, "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
+# SQLite has no tsvector, book search uses an FTS5 table keyed by books.id instead
+event.listen(
+    Base.metadata, "after_create",
+    DDL("CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(title, authors)").execute_if(dialect="sqlite")
+)
+event.listen(
+    Base.metadata, "before_drop",
+    DDL("DROP TABLE IF EXISTS books_fts").execute_if(dialect="sqlite")
+)
+
 book_authors = Table(
     "book_authors",
     Base.metadata,
-    Column("book_id", ForeignKey("books.id"), primary_key=True),
+    Column("book_id", ForeignKey("books.id", ondelete="CASCADE"), primary_key=True),
     Column("author_id", ForeignKey("authors.id"), primary_key=True)
 )
 
@@ -20,8 +35,23 @@ class Book(Base):
     title = Column(String, nullable=False)
     genre = Column(SQLEnum(Genre), nullable=False)
     published_year = Column(Integer, nullable=False)
+    search_vector = Column(TSVECTOR().with_variant(Text(), "sqlite"), nullable=True)
+    version = Column(Integer, nullable=False, server_default="1")
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    # copy of the book's [{id, name}] authors ordered by id, kept in sync on write; NULL falls back to the join
+    authors_json = Column(JSON, nullable=True)
     authors = relationship("Author", secondary=book_authors, back_populates="books")
 
+    __table_args__ = (
+        Index("ix_books_title_id", "title", "id"),
+        Index("ix_books_published_year_id", "published_year", "id"),
+        Index("ix_books_search_vector", "search_vector", postgresql_using="gin").ddl_if(dialect="postgresql"),
+        Index(
+            "ix_books_title_trgm", "title",
+            postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}
+        ).ddl_if(dialect="postgresql"),
+    )
+
 
 class Author(Base):
     __tablename__ = "authors"
@@ -30,6 +60,35 @@ class Author(Base):
     name = Column(String, unique=True, nullable=False)
     books = relationship("Book", secondary=book_authors, back_populates="authors")
 
+    __table_args__ = (
+        Index(
+            "ix_authors_name_trgm", "name",
+            postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}
+        ).ddl_if(dialect="postgresql"),
+    )
+
+
+class BookFacet(Base):
+    """Book counts per genre, decade and author id, adjusted in the same transaction as every book write."""
+
+    __tablename__ = "book_facets"
+
+    facet = Column(String, primary_key=True)
+    value = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, server_default="0")
+
+    __table_args__ = (
+        Index("ix_book_facets_facet_count", "facet", "count"),
+    )
+
+
+class CatalogState(Base):
+    __tablename__ = "catalog_state"
+
+    id = Column(Integer, primary_key=True)
+    generation = Column(Integer, nullable=False, server_default="0")
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
 
 class User(Base):
     __tablename__ = 'users'
@@ -0,0 +1,121 @@
+import logging
+import os
+import re
+import sys
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+import greenlet
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_APP_DIR = os.path.dirname(os.path.abspath(__file__)) + os.sep
+_SKIP_FILES = {os.path.abspath(__file__), os.path.join(_APP_DIR, "db.py"), os.path.join(_APP_DIR, "metrics.py")}
+
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAMS = re.compile(r"\$\d+|%\(\w+\)s|%s|(?<!:):\w+|\?")
+_LISTS = re.compile(r"\(\?(?:, \?)+\)")
+_ROWS = re.compile(r"(\((?:\?|\.\.\.)(?:, (?:\?|\.\.\.))*\))(?:, \1)+")
+_SPACES = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    sql = _SPACES.sub(" ", statement).strip()
+    sql = _NUMBERS.sub("?", _PARAMS.sub("?", _STRINGS.sub("?", sql)))
+    sql = _ROWS.sub(r"\1, ...", sql)
+    return _LISTS.sub("(...)", sql)
+
+
+def _call_site() -> str:
+    # SQLAlchemy runs the cursor in a child greenlet; the awaiting service code is on the parent's stack
+    frame = sys._getframe(1)
+    current = greenlet.getcurrent()
+    while True:
+        while frame is not None:
+            filename = frame.f_code.co_filename
+            if filename.startswith(_APP_DIR) and filename not in _SKIP_FILES:
+                return f"{os.path.relpath(filename, os.path.dirname(_APP_DIR))}:{frame.f_lineno} in {frame.f_code.co_name}"
+            frame = frame.f_back
+        current = current.parent
+        if current is None:
+            return "unknown"
+        frame = current.gr_frame
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryRecorder:
+    def __init__(self, label: str = ""):
+        self.label = label
+        self.statements: list[tuple[str, str]] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def repeated(self, threshold: int) -> list[tuple[str, str, int]]:
+        counts = Counter(self.statements)
+        return [(fp, site, n) for (fp, site), n in counts.most_common() if n >= threshold]
+
+    def report(self) -> str:
+        return "\n".join(f"  {n}x {fp}  [{site}]" for (fp, site), n in Counter(self.statements).most_common())
+
+
+current_recorder: ContextVar[QueryRecorder | None] = ContextVar("current_recorder", default=None)
+
+
+def watch_engine(engine: AsyncEngine):
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        recorder = current_recorder.get()
+        if recorder is not None:
+            recorder.statements.append((fingerprint(statement), _call_site()))
+
+
+def check_budget(recorder: QueryRecorder, max_statements: int | None, strict: bool = True):
+    label = recorder.label or "block"
+    for fp, site, n in recorder.repeated(settings.query_budget_repeat_threshold):
+        logger.warning("Possible N+1 in %s: %d x %s at %s", label, n, fp, site)
+    if max_statements is not None and recorder.count > max_statements:
+        message = f"{label} ran {recorder.count} SQL statements, budget is {max_statements}:\n{recorder.report()}"
+        if strict:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+@contextmanager
+def query_budget(max_statements: int | None = None, label: str = "", strict: bool = True):
+    recorder = QueryRecorder(label)
+    token = current_recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        current_recorder.reset(token)
+    check_budget(recorder, max_statements, strict)
+
+
+class QueryBudgetMiddleware:
+    """Records every request's statements and logs N+1 patterns and budget overruns; meant for staging."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        recorder = QueryRecorder()
+        token = current_recorder.set(recorder)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_recorder.reset(token)
+        route = scope.get("route")
+        recorder.label = f"{scope['method']} {route.path if route is not None else scope['path']}"
+        check_budget(recorder, settings.query_budget_per_request, strict=False)
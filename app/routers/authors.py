@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.db import get_conn, mark_recent_write
+from app.schemas.book_schema import AuthorRename, AuthorRenameResult
+from app.services import book_service
+from app.routers.auth import get_current_user
+from app.errors import NotFoundError
+from app.routers.utils import get_common_responses
+
+router = APIRouter(prefix="/authors", tags=["Authors"])
+
+
+@router.patch(
+    "/{author_id}",
+    response_model=AuthorRenameResult,
+    responses=get_common_responses(),
+    dependencies=[Depends(mark_recent_write)],
+)
+async def rename_author(author_id: int, payload: AuthorRename, conn: AsyncConnection = Depends(get_conn),
+                        user=Depends(get_current_user)):
+    renamed = await book_service.rename_author(conn, author_id, payload.name)
+    if not renamed:
+        raise NotFoundError("Author", author_id)
+    return renamed
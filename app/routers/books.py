@@ -1,25 +1,29 @@
-from fastapi import APIRouter, Depends, UploadFile, Request, Query, status
+from fastapi import APIRouter, Depends, UploadFile, Request, Response, Query, status
 from typing import List, Optional, Literal
 from sqlalchemy.ext.asyncio import AsyncConnection
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-import csv, io, json
+from datetime import datetime
+import csv, hashlib, io, json
 
-from app.db import get_conn
+from app.db import get_conn, get_read_conn, get_read_connector, mark_recent_write
 from app.schemas.book_schema import (
     BookCreate, BookOut, BookUpdate, SortField, SortOrder,
-    MessageResponse, Genre
+    MessageResponse, Genre, BookIdsRequest, BookBulkDeleteResult,
+    BookBatchGetResult, BookBatchPatchRequest, BookPatchResult, BookStats, TotalStrategy
 )
-from app.services import book_service
+from app.services import book_service, import_service
 from app.routers.auth import get_current_user
 from app.errors import NotFoundError, AppError, UnauthorizedError
 from app.limiter import limiter
-from app.routers.utils import get_common_responses
+from app.routers.utils import get_common_responses, http_date, is_not_modified
+from app.serialization import fast_json
+from app.config import settings
 
 router = APIRouter(prefix="/books", tags=["Books"])
 
 
-def book_to_out(book: dict) -> BookOut:
+def book_to_dict(book: dict) -> dict:
     authors = []
     for a in book.get("authors", []):
         if isinstance(a, dict):
@@ -29,14 +33,57 @@ def book_to_out(book: dict) -> BookOut:
             aid = 0
             name = str(a)
         authors.append({"id": aid, "name": name})
-    data = {
+    return {
         "id": int(book["id"]),
         "title": book["title"],
         "genre": book.get("genre"),
         "published_year": int(book["published_year"]) if book.get("published_year") is not None else None,
         "authors": authors,
     }
-    return BookOut.model_validate(data)
+
+
+def book_to_out(book: dict) -> BookOut:
+    return BookOut.model_validate(book_to_dict(book))
+
+
+EXPORT_FIELDS = ["id", "title", "genre", "published_year", "authors"]
+
+
+def _export_row(book: dict) -> dict:
+    return {
+        "id": book["id"],
+        "title": book["title"],
+        "genre": book["genre"],
+        "published_year": book["published_year"],
+        "authors": ";".join([a["name"] for a in book.get("authors", [])])
+    }
+
+
+async def _export_json(connect):
+    separator = "\n"
+    yield b"["
+    async with connect() as conn:
+        async for batch in book_service.iter_books(conn):
+            parts = []
+            for b in batch:
+                parts.append(separator + json.dumps(_export_row(b), ensure_ascii=False))
+                separator = ",\n"
+            yield "".join(parts).encode("utf-8")
+    yield b"\n]\n"
+
+
+async def _export_csv(connect):
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    async with connect() as conn:
+        async for batch in book_service.iter_books(conn):
+            writer.writerows(_export_row(b) for b in batch)
+            yield output.getvalue().encode("utf-8")
+            output.seek(0)
+            output.truncate()
+    if output.tell():
+        yield output.getvalue().encode("utf-8")
 
 
 @router.get(
@@ -45,33 +92,18 @@ def book_to_out(book: dict) -> BookOut:
 )
 async def export_books(
     format: Literal["json", "csv"] = Query("json"),
-    conn: AsyncConnection = Depends(get_conn)
+    connect=Depends(get_read_connector)
 ):
-    books = await book_service.get_books(conn, limit=10000, offset=0)
-    rows = []
-    for b in books:
-        rows.append({
-            "id": b["id"],
-            "title": b["title"],
-            "genre": b["genre"],
-            "published_year": b["published_year"],
-            "authors": ";".join([a["name"] for a in b.get("authors", [])])
-        })
-
+    # the body opens its own connection: this one would be closed before streaming starts
     if format == "json":
-        data = json.dumps(rows, ensure_ascii=False, indent=2)
         return StreamingResponse(
-            io.BytesIO(data.encode("utf-8")),
+            _export_json(connect),
             media_type="application/json",
             headers={"Content-Disposition": "attachment; filename=books.json"}
         )
     else:
-        output = io.StringIO()
-        writer = csv.DictWriter(output, fieldnames=["id", "title", "genre", "published_year", "authors"])
-        writer.writeheader()
-        writer.writerows(rows)
         return StreamingResponse(
-            io.BytesIO(output.getvalue().encode("utf-8")),
+            _export_csv(connect),
             media_type="text/csv",
             headers={"Content-Disposition": "attachment; filename=books.csv"}
         )
@@ -82,6 +114,7 @@ async def export_books(
     response_model=BookOut,
     status_code=201,
     responses=get_common_responses(),
+    dependencies=[Depends(mark_recent_write)],
 )
 async def create_book(book: BookCreate, conn: AsyncConnection = Depends(get_conn), user=Depends(get_current_user)):
     created = await book_service.create_book(
@@ -98,10 +131,12 @@ async def create_book(book: BookCreate, conn: AsyncConnection = Depends(get_conn
     "/",
     response_model=List[BookOut],
     responses=get_common_responses(),
+    dependencies=[Depends(limiter.limit("list_books", "20/minute"))],
 )
-@limiter.limit("20/minute")
 async def list_books(
         request: Request,
+        response: Response,
+        q: Optional[str] = Query(None, description="Ranked search over titles and author names"),
         title: Optional[str] = None,
         author: Optional[str] = None,
         genre: Optional[Genre] = None,
@@ -111,8 +146,26 @@ async def list_books(
         order: SortOrder = SortOrder.asc,
         skip: int = Query(0, ge=0),
         limit: int = Query(10, ge=1, le=50),
-        conn: AsyncConnection = Depends(get_conn)
+        cursor: Optional[str] = Query(None, description="Opaque cursor taken from the X-Next-Cursor header"),
+        include_facets: bool = Query(False, description="Add genre/decade/author counts for the filters as X-Facets JSON"),
+        include_total: Optional[TotalStrategy] = Query(
+            None, description="Add X-Total-Count; X-Total-Count-Strategy tells how it was obtained"
+        ),
+        conn: AsyncConnection = Depends(get_read_conn)
 ):
+    if cursor and skip:
+        raise AppError(message="skip cannot be combined with cursor", status_code=status.HTTP_400_BAD_REQUEST)
+    catalog = await book_service.get_catalog_state(conn)
+    query_digest = hashlib.sha1(str(sorted(request.query_params.multi_items())).encode("utf-8")).hexdigest()[:16]
+    etag = f'"l{catalog["generation"]}-{query_digest}"'
+    last_modified = datetime.fromisoformat(catalog["updated_at"]) if catalog["updated_at"] else None
+    validators = {"ETag": etag}
+    if last_modified:
+        validators["Last-Modified"] = http_date(last_modified)
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=validators)
+    response.headers.update(validators)
+    after = book_service.decode_cursor(cursor, sort_by.value, order.value) if cursor else None
     books = await book_service.get_books(
         conn,
         title=title,
@@ -122,21 +175,102 @@ async def list_books(
         year_to=year_to,
         sort_by=sort_by.value,
         order=order.value,
-        limit=limit,
-        offset=skip
+        limit=limit + 1,
+        offset=skip,
+        after=after,
+        q=q,
     )
+    if include_total:
+        total, strategy = await book_service.count_books(
+            conn, include_total.value, title=title, author=author, genre=genre.value if genre else None,
+            year_from=year_from, year_to=year_to, q=q,
+        )
+        response.headers["X-Total-Count"] = str(total)
+        response.headers["X-Total-Count-Strategy"] = strategy
+    if include_facets:
+        stats = await book_service.get_book_stats(
+            conn, title=title, author=author, genre=genre.value if genre else None,
+            year_from=year_from, year_to=year_to, q=q,
+        )
+        response.headers["X-Facets"] = json.dumps(stats, separators=(",", ":"))
+    if len(books) > limit:
+        books = books[:limit]
+        if sort_by != SortField.relevance:
+            response.headers["X-Next-Cursor"] = book_service.encode_cursor(books[-1], sort_by.value, order.value)
+    if settings.fast_responses:
+        return fast_json([book_to_dict(b) for b in books], response)
     return [book_to_out(b) for b in books]
 
 
+@router.post(
+    "/batch-get",
+    response_model=BookBatchGetResult,
+    responses=get_common_responses(),
+)
+async def batch_get_books(payload: BookIdsRequest, conn: AsyncConnection = Depends(get_read_conn)):
+    books = await book_service.get_books_by_ids(conn, payload.ids)
+    found = {b["id"] for b in books}
+    not_found = [i for i in dict.fromkeys(payload.ids) if i not in found]
+    if settings.fast_responses:
+        return fast_json({"books": [book_to_dict(b) for b in books], "not_found": not_found})
+    return {"books": [book_to_out(b) for b in books], "not_found": not_found}
+
+
+@router.patch(
+    "/batch",
+    response_model=List[BookPatchResult],
+    responses=get_common_responses(),
+    dependencies=[Depends(mark_recent_write)],
+)
+async def batch_patch_books(payload: BookBatchPatchRequest, conn: AsyncConnection = Depends(get_conn),
+                            user=Depends(get_current_user)):
+    items = [item.model_dump(exclude_unset=True) | {"id": item.id} for item in payload.items]
+    for item in items:
+        if item.get("genre") is not None:
+            item["genre"] = item["genre"].value if hasattr(item["genre"], "value") else item["genre"]
+    results = await book_service.update_books(conn, items)
+    return [r | {"book": book_to_out(r["book"])} if r.get("book") else r for r in results]
+
+
+@router.get(
+    "/stats",
+    response_model=BookStats,
+    responses=get_common_responses(),
+)
+async def book_stats(
+        q: Optional[str] = None,
+        title: Optional[str] = None,
+        author: Optional[str] = None,
+        genre: Optional[Genre] = None,
+        year_from: Optional[int] = None,
+        year_to: Optional[int] = None,
+        top_authors: int = Query(10, ge=1, le=100),
+        exact: bool = Query(False, description="Group the books now instead of reading the maintained counters"),
+        conn: AsyncConnection = Depends(get_read_conn)
+):
+    return await book_service.get_book_stats(
+        conn, title=title, author=author, genre=genre.value if genre else None,
+        year_from=year_from, year_to=year_to, q=q, top_authors=top_authors, exact=exact,
+    )
+
+
 @router.get(
     "/{book_id}",
     response_model=BookOut,
     responses=get_common_responses(),
 )
-async def get_book(book_id: int, conn: AsyncConnection = Depends(get_conn)):
+async def get_book(book_id: int, request: Request, response: Response, conn: AsyncConnection = Depends(get_read_conn)):
     book = await book_service.get_book_by_id(conn, book_id)
     if not book:
         raise NotFoundError("Book", book_id)
+    last_modified = datetime.fromisoformat(book["updated_at"])
+    etag = f'"{book["id"]}-{book["version"]}-{int(last_modified.timestamp())}"'
+    validators = {"ETag": etag, "Last-Modified": http_date(last_modified)}
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=validators)
+    response.headers.update(validators)
+    if settings.fast_responses:
+        return fast_json(book_to_dict(book), response)
     return book_to_out(book)
 
 
@@ -144,6 +278,7 @@ async def get_book(book_id: int, conn: AsyncConnection = Depends(get_conn)):
     "/{book_id}",
     response_model=BookOut,
     responses=get_common_responses(),
+    dependencies=[Depends(mark_recent_write)],
 )
 async def update_book(book_id: int, payload: BookUpdate, conn: AsyncConnection = Depends(get_conn),
                       user=Depends(get_current_user)):
@@ -162,6 +297,7 @@ async def update_book(book_id: int, payload: BookUpdate, conn: AsyncConnection =
     "/{book_id}",
     response_model=MessageResponse,
     responses=get_common_responses(),
+    dependencies=[Depends(mark_recent_write)],
 )
 async def delete_book(book_id: int, conn: AsyncConnection = Depends(get_conn), user=Depends(get_current_user)):
     ok = await book_service.delete_book(conn, book_id)
@@ -170,16 +306,42 @@ async def delete_book(book_id: int, conn: AsyncConnection = Depends(get_conn), u
     return MessageResponse(message="Book deleted")
 
 
+@router.delete(
+    "/",
+    response_model=BookBulkDeleteResult,
+    responses=get_common_responses(),
+    dependencies=[Depends(mark_recent_write)],
+)
+async def delete_books(payload: BookIdsRequest, conn: AsyncConnection = Depends(get_conn), user=Depends(get_current_user)):
+    return await book_service.delete_books(conn, payload.ids)
+
+
 class BookImportPayload(BaseModel):
     books: List[BookCreate]
 
 
+def _import_format(filename: str | None) -> str:
+    if filename and filename.endswith(".json"):
+        return "json"
+    if filename and filename.endswith(".csv"):
+        return "csv"
+    raise AppError(
+        message="Unsupported file format. Only JSON and CSV are allowed.",
+        status_code=status.HTTP_400_BAD_REQUEST,
+        details={"filename": filename}
+    )
+
+
 @router.post(
     "/import",
     responses=get_common_responses(),
+    dependencies=[Depends(mark_recent_write)],
 )
 async def import_books(
     file: UploadFile,
+    stream: bool = Query(False, description="Parse the upload incrementally and import it in batches"),
+    batch_size: Optional[int] = Query(None, ge=1, le=book_service.MAX_IMPORT_BATCH_SIZE),
+    commit_per_batch: bool = Query(False, description="Commit after every batch in streaming mode"),
     conn: AsyncConnection = Depends(get_conn),
     current_user: dict = Depends(get_current_user),
 ):
@@ -187,10 +349,16 @@ async def import_books(
         raise UnauthorizedError()
 
     try:
-        if file.filename.endswith(".json"):
+        file_format = _import_format(file.filename)
+        if stream:
+            return await import_service.import_books_stream(
+                conn, file, file_format, batch_size=batch_size, commit_per_batch=commit_per_batch
+            )
+
+        if file_format == "json":
             data = json.loads((await file.read()).decode("utf-8"))
 
-        elif file.filename.endswith(".csv"):
+        else:
             content = (await file.read()).decode("utf-8").splitlines()
             reader = csv.DictReader(content)
             data = [dict(row) for row in reader]
@@ -199,14 +367,7 @@ async def import_books(
                 if "authors" in d and isinstance(d["authors"], str):
                     d["authors"] = [a.strip() for a in d["authors"].split(";") if a.strip()]
 
-        else:
-            raise AppError(
-                message="Unsupported file format. Only JSON and CSV are allowed.",
-                status_code=status.HTTP_400_BAD_REQUEST,
-                details={"filename": file.filename}
-            )
-
-        books = await book_service.bulk_create_books(conn, data)
+        books = await book_service.bulk_create_books(conn, data, batch_size=batch_size)
         return {"imported": len(books)}
 
     except AppError:
@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Depends
+
+from app.cache import cache
+from app.db import pool_monitor, replica_monitors
+from app.hashing import password_hasher
+from app.limiter import limiter
+from app.routers.auth import get_current_user
+from app.routers.utils import get_common_responses
+
+# internal counters and pool layout are for operators, not anonymous clients
+router = APIRouter(prefix="/system", tags=["System"], dependencies=[Depends(get_current_user)])
+
+
+@router.get(
+    "/cache",
+    responses=get_common_responses(),
+)
+async def cache_stats():
+    return cache.stats()
+
+
+@router.get(
+    "/password-hashing",
+    responses=get_common_responses(),
+)
+async def password_hashing_stats():
+    return password_hasher.stats()
+
+
+@router.get(
+    "/pool",
+    responses=get_common_responses(),
+)
+async def pool_stats():
+    return {"primary": pool_monitor.stats(), "replicas": [m.stats() for m in replica_monitors]}
+
+
+@router.get(
+    "/rate-limit",
+    responses=get_common_responses(),
+)
+async def rate_limit_stats():
+    return limiter.stats()
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field, field_validator
 from enum import Enum
-from typing import List
+from typing import List, Optional, Literal
 import datetime
 
 
@@ -14,6 +14,7 @@ class Genre(str, Enum):
 class SortField(str, Enum):
     title = "title"
     published_year = "published_year"
+    relevance = "relevance"
 
 
 class SortOrder(str, Enum):
@@ -21,6 +22,12 @@ class SortOrder(str, Enum):
     desc = "desc"
 
 
+class TotalStrategy(str, Enum):
+    exact = "exact"
+    estimated = "estimated"
+    cached = "cached"
+
+
 class BookBase(BaseModel):
     title: str = Field(..., min_length=1)
     genre: Genre
@@ -39,10 +46,10 @@ class BookCreate(BookBase):
 
 
 class BookUpdate(BaseModel):
-    title: str
-    genre: Genre
-    published_year: int
-    authors: List[str]
+    title: Optional[str] = None
+    genre: Optional[Genre] = None
+    published_year: Optional[int] = None
+    authors: Optional[List[str]] = None
 
 
 class AuthorOut(BaseModel):
@@ -59,5 +66,64 @@ class BookOut(BookBase):
     model_config = {"from_attributes": True}
 
 
+class BookIdsRequest(BaseModel):
+    ids: List[int] = Field(min_length=1, max_length=1000)
+
+
+class BookBulkDeleteResult(BaseModel):
+    deleted: List[int]
+    not_found: List[int]
+
+
+class BookBatchGetResult(BaseModel):
+    books: List[BookOut]
+    not_found: List[int]
+
+
+class BookPatchItem(BookUpdate):
+    id: int
+
+
+class BookBatchPatchRequest(BaseModel):
+    items: List[BookPatchItem] = Field(min_length=1, max_length=1000)
+
+
+class BookPatchResult(BaseModel):
+    id: int
+    status: Literal["updated", "not_found", "invalid"]
+    book: Optional[BookOut] = None
+    error: Optional[str] = None
+
+
+class GenreCount(BaseModel):
+    genre: str
+    count: int
+
+
+class DecadeCount(BaseModel):
+    decade: int
+    count: int
+
+
+class AuthorCount(AuthorOut):
+    count: int
+
+
+class BookStats(BaseModel):
+    total: int
+    genres: List[GenreCount]
+    decades: List[DecadeCount]
+    authors: List[AuthorCount]
+    source: Literal["counters", "exact"]
+
+
+class AuthorRename(BaseModel):
+    name: str = Field(..., min_length=1)
+
+
+class AuthorRenameResult(AuthorOut):
+    books: int
+
+
 class MessageResponse(BaseModel):
     message: str
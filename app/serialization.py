@@ -0,0 +1,34 @@
+import json
+from typing import Any
+from fastapi import Response
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """Serializes plain dicts and lists as they are, with orjson when it is installed."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def fast_json(content: Any, response: Response | None = None, status_code: int = 200) -> FastJSONResponse:
+    """Build the final response from already trusted data, skipping response_model validation.
+
+    Headers set on the route's ``response`` parameter are carried over, since FastAPI drops them
+    when an endpoint returns a Response itself.
+    """
+    result = FastJSONResponse(content, status_code=status_code)
+    if response is not None:
+        result.headers.raw.extend(response.headers.raw)
+    return result
@@ -1,6 +1,10 @@
 from passlib.hash import bcrypt
 from jose import jwt, JWTError
 from datetime import datetime, timedelta, timezone
+import hashlib
+import time
+from app.cache import TTLCache, NullCacheBackend, cache
+from app.hashing import password_hasher
 from app.config import settings
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncConnection
@@ -17,6 +21,14 @@ def verify_password(plain: str, hashed: str) -> bool:
     return bcrypt.verify(plain, hashed)
 
 
+async def hash_password_async(password: str) -> str:
+    return await password_hasher.run(hash_password, password)
+
+
+async def verify_password_async(plain: str, hashed: str) -> bool:
+    return await password_hasher.run(verify_password, plain, hashed)
+
+
 def create_access_token(data: dict, expires_seconds: int | None = None) -> str:
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(seconds=(expires_seconds or settings.jwt_expiration))
@@ -33,6 +45,65 @@ def decode_token(token: str) -> dict:
         raise
 
 
+_principals = TTLCache(settings.principal_cache_size, ttl=settings.principal_cache_ttl)
+
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def _principal_generation(username: str) -> str:
+    return f"user:{username}"
+
+
+def _principal_cache_enabled() -> bool:
+    # entries are only dropped through the shared generations, which a disabled cache cannot bump
+    return not isinstance(cache.backend, NullCacheBackend)
+
+
+async def principal_generation(username: str) -> int:
+    """Read before loading the user, so that a change committed meanwhile outdates the entry cached from it."""
+    return await cache.generation(_principal_generation(username))
+
+
+async def get_cached_principal(token: str) -> dict | None:
+    entry = _principals.get(_token_key(token))
+    if entry is None:
+        return None
+    # every worker compares against the same per-user generation, so invalidation reaches them all
+    if entry["generation"] != await principal_generation(entry["user"]["username"]):
+        _principals.pop(_token_key(token))
+        return None
+    return entry
+
+
+def cached_username(token: str) -> str | None:
+    """Username of a cached token without checking its generation, for uses that grant nothing."""
+    entry = _principals.get(_token_key(token))
+    return None if entry is None else entry["user"]["username"]
+
+
+def cache_principal(token: str, claims: dict, user: dict, generation: int):
+    if not _principal_cache_enabled():
+        return
+    ttl = float(settings.principal_cache_ttl)
+    exp = claims.get("exp")
+    if exp is not None:
+        ttl = min(ttl, float(exp) - time.time())
+    if ttl <= 0:
+        return
+    _principals.set(_token_key(token), {"claims": claims, "user": user, "generation": generation}, ttl)
+
+
+async def invalidate_principal(username: str):
+    """Call after any change to a user's account, committed, so that no worker keeps authenticating old tokens."""
+    await cache.bump(_principal_generation(username))
+
+
+def clear_principal_cache():
+    _principals.clear()
+
+
 async def get_user_by_username(conn: AsyncConnection, username: str) -> dict | None:
     q = await conn.execute(text("SELECT id, username, email, hashed_password FROM users WHERE username = :username"), {"username": username})
     row = q.mappings().first()
@@ -44,7 +115,7 @@ async def get_user_by_username(conn: AsyncConnection, username: str) -> dict | N
 async def create_user(conn: AsyncConnection, username: str, password: str, email: str | None = None) -> dict:
     if not username or not username.strip():
         raise AppError("Invalid username", status_code=status.HTTP_400_BAD_REQUEST)
-    hashed = hash_password(password)
+    hashed = await hash_password_async(password)
     try:
         r = await conn.execute(
             text("INSERT INTO users (username, email, hashed_password) VALUES (:username, :email, :hpw) RETURNING id, username, email"),
@@ -54,6 +125,8 @@ async def create_user(conn: AsyncConnection, username: str, password: str, email
         if not row:
             raise AppError("Failed to create user", status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
         await conn.commit()
+        # the name may belong to a removed account whose tokens are still cached somewhere
+        await invalidate_principal(row["username"])
         return {"id": row["id"], "username": row["username"], "email": row["email"], "hashed_password": hashed}
     except IntegrityError:
         await conn.rollback()
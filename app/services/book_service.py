@@ -3,33 +3,250 @@ from sqlalchemy.ext.asyncio import AsyncConnection
 from typing import List, Optional
 from app.errors import AppError
 from fastapi import status
+import base64
 import datetime
-from app.schemas.book_schema import SortField, SortOrder
+import hashlib
+import json
+import re
+import weakref
+from app.cache import TTLCache, cache
+from app.config import settings
+from app.schemas.book_schema import Genre, SortField, SortOrder
 
+SEARCH_CONFIG = "simple"
+LIST_CACHE_GENERATION = "books"
+CATALOG_STATE_CACHE_KEY = "catalog_state"
+AUTHORS_CACHE_GENERATION = "authors"
+BOOK_COLUMNS = "id, title, genre, published_year, version, updated_at"
+PAGE_COLUMNS = f"{BOOK_COLUMNS}, authors_json"
 
 
+def _bind_list(prefix: str, values: list, params: dict) -> str:
+    placeholders = []
+    for i, value in enumerate(values):
+        key = f"{prefix}{i}"
+        placeholders.append(f":{key}")
+        params[key] = value
+    return ", ".join(placeholders)
 
-async def _ensure_author_and_get_id(conn: AsyncConnection, name: str) -> int:
-    name = (name or "").strip()
-    if not name:
-        raise AppError("Invalid author name", status_code=status.HTTP_400_BAD_REQUEST, details={"name": name})
-    q = await conn.execute(text("SELECT id FROM authors WHERE name = :name"), {"name": name})
+
+def _book_generation(book_id: int) -> str:
+    return f"book:{book_id}"
+
+
+async def _book_cache_key(book_id: int) -> str:
+    # keyed by the book's own generation read before the row: a reader that loaded the row before a
+    # write committed stores it under a generation that the write has already left behind
+    generation = await cache.generation(_book_generation(book_id))
+    return f"book:{book_id}:{generation}"
+
+
+async def _list_cache_key(query: dict) -> str:
+    generation = await cache.generation(LIST_CACHE_GENERATION)
+    digest = hashlib.sha1(json.dumps(query, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    return f"books:{generation}:{digest}"
+
+
+def _timestamp(value) -> str | None:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        # SQLite CURRENT_TIMESTAMP is UTC without an offset
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return value.isoformat()
+
+
+async def invalidate_books(book_ids: List[int] | None = None):
+    for book_id in book_ids or ():
+        await cache.bump(_book_generation(book_id))
+    # every cached listing may include a new or changed book, so drop the whole list generation;
+    # the catalog state is keyed by it too
+    await cache.bump(LIST_CACHE_GENERATION)
+
+
+async def _touch_catalog(conn: AsyncConnection):
+    await conn.execute(text(
+        "INSERT INTO catalog_state (id, generation, updated_at) VALUES (1, 1, CURRENT_TIMESTAMP) "
+        "ON CONFLICT (id) DO UPDATE SET generation = catalog_state.generation + 1, updated_at = CURRENT_TIMESTAMP"
+    ))
+
+
+async def get_catalog_state(conn: AsyncConnection) -> dict:
+    cache_key = f"{CATALOG_STATE_CACHE_KEY}:{await cache.generation(LIST_CACHE_GENERATION)}"
+    cached = await cache.get(cache_key)
+    if cached is not None:
+        return cached
+    q = await conn.execute(text("SELECT generation, updated_at FROM catalog_state WHERE id = 1"))
     row = q.mappings().first()
-    if row:
-        return row["id"]
-    await conn.execute(text("INSERT INTO authors (name) VALUES (:name) ON CONFLICT (name) DO NOTHING"), {"name": name})
-    q2 = await conn.execute(text("SELECT id FROM authors WHERE name = :name"), {"name": name})
-    row2 = q2.mappings().first()
-    if row2:
-        return row2["id"]
-    raise AppError("Failed to create author", status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    state = {"generation": row["generation"], "updated_at": _timestamp(row["updated_at"])} if row else {"generation": 0, "updated_at": None}
+    await cache.set(cache_key, state)
+    return state
+
+
+# name -> id of authors known to be committed; authors are never deleted, and a rename bumps the
+# shared "authors" generation so that every worker drops its copy
+_author_ids = TTLCache(settings.author_cache_size)
+_author_ids_generation = 0
+# ids resolved inside a still open transaction only become cacheable once it commits
+_pending_author_ids: "weakref.WeakKeyDictionary[AsyncConnection, dict]" = weakref.WeakKeyDictionary()
+
+
+async def commit_changes(conn: AsyncConnection):
+    await conn.commit()
+    pending = _pending_author_ids.pop(conn, None)
+    if pending:
+        for name, author_id in pending.items():
+            _author_ids.set(name, author_id)
+
+
+async def rollback_changes(conn: AsyncConnection):
+    _pending_author_ids.pop(conn, None)
+    await conn.rollback()
+
+
+async def _upsert_authors(conn: AsyncConnection, names: List[str]) -> dict:
+    # sorted, so that concurrent imports wait on each other's new names in one order and cannot deadlock;
+    # DO NOTHING leaves existing rows unlocked and unwritten, they are read back separately
+    names = sorted(names)
+    params = {f"n{i}": name for i, name in enumerate(names)}
+    values = ", ".join(f"(:{key})" for key in params)
+    q = await conn.execute(
+        text(f"INSERT INTO authors (name) VALUES {values} ON CONFLICT (name) DO NOTHING RETURNING id, name"),
+        params
+    )
+    resolved = {r["name"]: r["id"] for r in q.mappings().all()}
+    existing = [name for name in names if name not in resolved]
+    if existing:
+        params = {}
+        q = await conn.execute(
+            text(f"SELECT id, name FROM authors WHERE name IN ({_bind_list('e', existing, params)})"), params
+        )
+        resolved.update({r["name"]: r["id"] for r in q.mappings().all()})
+    return resolved
+
+
+async def resolve_author_ids(conn: AsyncConnection, names: List[str]) -> dict:
+    global _author_ids_generation
+    generation = await cache.generation(AUTHORS_CACHE_GENERATION)
+    if generation != _author_ids_generation:
+        _author_ids.clear()
+        _author_ids_generation = generation
+    pending = _pending_author_ids.get(conn, {})
+    resolved = {}
+    missing = []
+    for name in dict.fromkeys(names):
+        author_id = _author_ids.get(name) or pending.get(name)
+        if author_id is None:
+            missing.append(name)
+        else:
+            resolved[name] = author_id
+    if missing:
+        fetched = await _upsert_authors(conn, missing)
+        _pending_author_ids.setdefault(conn, {}).update(fetched)
+        resolved.update(fetched)
+    return resolved
 
 
-async def _try_insert_book_author(conn: AsyncConnection, book_id: int, author_id: int):
+def _authors_json(authors: List[dict]) -> str:
+    return json.dumps(sorted(authors, key=lambda a: a["id"]), ensure_ascii=False, separators=(",", ":"))
+
+
+def _clean_author_names(names) -> List[str]:
+    cleaned = ((name or "").strip() for name in names or [])
+    return list(dict.fromkeys(name for name in cleaned if name))
+
+
+async def _insert_book_authors(conn: AsyncConnection, links: List[dict]):
+    if links:
+        await conn.execute(
+            text("INSERT INTO book_authors (book_id, author_id) VALUES (:b, :a) ON CONFLICT DO NOTHING"),
+            links
+        )
+
+
+async def _refresh_search_index(conn: AsyncConnection, book_ids: List[int]):
+    if not book_ids:
+        return
+    params: dict = {}
+    ids_sql = _bind_list("s", book_ids, params)
+    if conn.dialect.name == "postgresql":
+        await conn.execute(
+            text(
+                "UPDATE books b SET search_vector = "
+                f"setweight(to_tsvector('{SEARCH_CONFIG}', b.title), 'A') || "
+                f"setweight(to_tsvector('{SEARCH_CONFIG}', COALESCE((SELECT string_agg(a.name, ' ') FROM book_authors ba "
+                "JOIN authors a ON a.id = ba.author_id WHERE ba.book_id = b.id), '')), 'B') "
+                f"WHERE b.id IN ({ids_sql})"
+            ),
+            params
+        )
+        return
+    await conn.execute(text(f"DELETE FROM books_fts WHERE rowid IN ({ids_sql})"), params)
+    await conn.execute(
+        text(
+            "INSERT INTO books_fts (rowid, title, authors) "
+            "SELECT b.id, b.title, COALESCE((SELECT group_concat(a.name, ' ') FROM book_authors ba "
+            "JOIN authors a ON a.id = ba.author_id WHERE ba.book_id = b.id), '') "
+            f"FROM books b WHERE b.id IN ({ids_sql})"
+        ),
+        params
+    )
+
+
+async def _remove_from_search_index(conn: AsyncConnection, book_ids: List[int]):
+    if conn.dialect.name == "sqlite" and book_ids:
+        params: dict = {}
+        await conn.execute(text(f"DELETE FROM books_fts WHERE rowid IN ({_bind_list('s', book_ids, params)})"), params)
+
+
+def _facet_rows_sql(books_sql: str, links_sql: str | None = None) -> str:
+    # one (facet, value) row per book and per author link; genre goes through TEXT for the Postgres enum
+    sql = (
+        f"SELECT 'genre' AS facet, CAST(genre AS TEXT) AS value FROM {books_sql} "
+        f"UNION ALL SELECT 'decade', CAST(published_year / 10 * 10 AS TEXT) FROM {books_sql}"
+    )
+    if links_sql:
+        sql += f" UNION ALL SELECT 'author', CAST(author_id AS TEXT) FROM {links_sql}"
+    return sql
+
+
+async def _adjust_facets(conn: AsyncConnection, book_ids: List[int], sign: int):
+    """Add (sign=1) or remove (sign=-1) the given books' current genre, decade and authors from the counters."""
+    if not book_ids:
+        return
+    params: dict = {"sign": sign}
+    ids_sql = _bind_list("f", book_ids, params)
+    rows_sql = _facet_rows_sql(
+        f"books WHERE id IN ({ids_sql})", f"book_authors WHERE book_id IN ({ids_sql})"
+    )
+    # rows are locked in (facet, value) order so that concurrent writers cannot deadlock on them;
+    # the WHERE keeps SQLite from reading ON CONFLICT as a join constraint
     await conn.execute(
-        text("INSERT INTO book_authors (book_id, author_id) VALUES (:b, :a) ON CONFLICT DO NOTHING"),
-        {"b": book_id, "a": author_id}
+        text(
+            f"INSERT INTO book_facets (facet, value, count) SELECT facet, value, :sign * COUNT(*) FROM ({rows_sql}) f "
+            "WHERE 1 = 1 GROUP BY facet, value ORDER BY facet, value "
+            "ON CONFLICT (facet, value) DO UPDATE SET count = book_facets.count + excluded.count"
+        ),
+        params
+    )
+
+
+async def _lock_books(conn: AsyncConnection, book_ids: List[int]) -> List[int]:
+    """Lock the books' rows until commit, before their facets are taken out, and return the ids still present.
+
+    Without it two writers could both read a book's old genre and decrement it twice. SQLite needs no row
+    locks: the facet upsert takes its database-wide write lock, and it reads the books after that.
+    """
+    if not book_ids or conn.dialect.name != "postgresql":
+        return book_ids
+    params: dict = {}
+    r = await conn.execute(
+        text(f"SELECT id FROM books WHERE id IN ({_bind_list('l', book_ids, params)}) ORDER BY id FOR UPDATE"),
+        params
     )
+    return [row[0] for row in r.fetchall()]
 
 
 async def create_book(conn: AsyncConnection, title: str, genre: str, published_year: int, authors: List[str]):
@@ -38,80 +255,153 @@ async def create_book(conn: AsyncConnection, title: str, genre: str, published_y
     now_year = datetime.datetime.now().year
     if published_year is None or not (1800 <= int(published_year) <= now_year):
         raise AppError("Invalid published_year", status_code=status.HTTP_400_BAD_REQUEST)
+    names = _clean_author_names(authors)
+    author_ids = await resolve_author_ids(conn, names)
+    result_authors = [{"id": author_ids[name], "name": name} for name in names]
     r = await conn.execute(
         text(
-            "INSERT INTO books (title, genre, published_year) "
-            "VALUES (:title, :genre, :year) RETURNING id, title, genre, published_year"
+            "INSERT INTO books (title, genre, published_year, authors_json) "
+            f"VALUES (:title, :genre, :year, :authors) RETURNING {BOOK_COLUMNS}"
         ),
-        {"title": title.strip(), "genre": genre, "year": published_year}
+        {"title": title.strip(), "genre": genre, "year": published_year, "authors": _authors_json(result_authors)}
     )
     book_row = r.mappings().first()
     if not book_row:
         raise AppError("Failed to create book", status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
     book_id = book_row["id"]
-    result_authors = []
-    for name in authors or []:
-        name = (name or "").strip()
-        if not name:
-            continue
-        author_id = await _ensure_author_and_get_id(conn, name)
-        await _try_insert_book_author(conn, book_id, author_id)
-        result_authors.append({"id": author_id, "name": name})
-    await conn.commit()
+    await _insert_book_authors(conn, [{"b": book_id, "a": author_ids[name]} for name in names])
+    await _adjust_facets(conn, [book_id], 1)
+    await _refresh_search_index(conn, [book_id])
+    await _touch_catalog(conn)
+    await commit_changes(conn)
+    await invalidate_books()
     return {
         "id": book_id,
         "title": book_row["title"],
         "genre": book_row["genre"],
         "published_year": book_row["published_year"],
+        "version": book_row["version"],
+        "updated_at": _timestamp(book_row["updated_at"]),
         "authors": result_authors,
     }
 
 
-async def _load_authors_for_book_ids(conn: AsyncConnection, book_ids: List[int]) -> dict:
-    if not book_ids:
-        return {}
-    placeholders = []
-    params = {}
-    for i, bid in enumerate(book_ids):
-        key = f"id{i}"
-        placeholders.append(f":{key}")
-        params[key] = bid
-    sql = (
-        "SELECT ba.book_id, a.id as author_id, a.name "
-        "FROM book_authors ba "
-        "JOIN authors a ON a.id = ba.author_id "
-        f"WHERE ba.book_id IN ({', '.join(placeholders)})"
+def _like(conn: AsyncConnection) -> str:
+    return "ILIKE" if conn.dialect.name == "postgresql" else "LIKE"
+
+
+def _authors_agg_sql(conn: AsyncConnection, book_id_sql: str = "b.id") -> str:
+    if conn.dialect.name == "postgresql":
+        return (
+            "COALESCE((SELECT json_agg(json_build_object('id', a.id, 'name', a.name) ORDER BY a.id) "
+            f"FROM book_authors ba JOIN authors a ON a.id = ba.author_id WHERE ba.book_id = {book_id_sql}), '[]')"
+        )
+    return (
+        "(SELECT json_group_array(json_object('id', s.id, 'name', s.name)) FROM ("
+        "SELECT a.id, a.name FROM book_authors ba JOIN authors a ON a.id = ba.author_id "
+        f"WHERE ba.book_id = {book_id_sql} ORDER BY a.id) s)"
     )
-    q = await conn.execute(text(sql), params)
-    rows = q.mappings().all()
-    mapping: dict = {}
-    for r in rows:
-        bid = r["book_id"]
-        mapping.setdefault(bid, []).append({"id": r["author_id"], "name": r["name"]})
-    return mapping
 
 
-async def get_books(
+def _authors_sql(conn: AsyncConnection, book_id_sql: str = "b.id", stored_sql: str = "b.authors_json") -> str:
+    # the stored copy answers without touching book_authors; the join only runs for rows not backfilled yet
+    return f"COALESCE({stored_sql}, {_authors_agg_sql(conn, book_id_sql)})"
+
+
+def _select_books_sql(conn: AsyncConnection, page_sql: str, order_sql: str = "") -> str:
+    # authors are read around the already filtered and limited page, so the fallback
+    # subquery can only run for the rows that are returned
+    return (
+        f"SELECT b.id, b.title, b.genre, b.published_year, b.version, b.updated_at, {_authors_sql(conn)} AS authors "
+        f"FROM ({page_sql}) b {order_sql}"
+    )
+
+
+def _row_to_book(row) -> dict:
+    book = dict(row)
+    authors = book.get("authors")
+    book["authors"] = json.loads(authors) if isinstance(authors, str) else list(authors or [])
+    if "updated_at" in book:
+        book["updated_at"] = _timestamp(book["updated_at"])
+    return book
+
+
+SORT_COLUMNS = {"title": "b.title", "published_year": "b.published_year"}
+
+
+def encode_cursor(book: dict, sort_by: str, order: str) -> str:
+    payload = json.dumps([sort_by, order, book[sort_by], book["id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_by: str, order: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, cursor_order, key, book_id = json.loads(raw)
+        book_id = int(book_id)
+    except Exception:
+        raise AppError("Invalid cursor", status_code=status.HTTP_400_BAD_REQUEST, details={"cursor": cursor})
+    if cursor_sort != sort_by or cursor_order != order:
+        raise AppError(
+            "Cursor does not match sort parameters",
+            status_code=status.HTTP_400_BAD_REQUEST,
+            details={"sort_by": cursor_sort, "order": cursor_order}
+        )
+    return key, book_id
+
+
+def _search_sql(conn: AsyncConnection, q: str, params: dict) -> tuple[str, str | None, str] | None:
+    terms = re.findall(r"\w+", q.lower())
+    if not terms:
+        return None
+    if conn.dialect.name == "postgresql":
+        # full-text prefix match on title + author names, plus trigram word similarity for typos.
+        # One UNION branch per index: ORed with a correlated subquery, the planner scans all books instead
+        params["tsq"] = " & ".join(f"{t}:*" for t in terms)
+        params["q"] = " ".join(terms)
+        tsquery = f"to_tsquery('{SEARCH_CONFIG}', :tsq)"
+        where = (
+            f"b.id IN (SELECT id FROM books WHERE search_vector @@ {tsquery} "
+            "UNION SELECT id FROM books WHERE :q <% title "
+            "UNION SELECT ba.book_id FROM book_authors ba JOIN authors a ON a.id = ba.author_id WHERE :q <% a.name)"
+        )
+        return "", where, f"(ts_rank(b.search_vector, {tsquery}) + word_similarity(:q, b.title))"
+    params["fts"] = " ".join(f'"{t}"*' for t in terms)
+    join = (
+        "JOIN (SELECT rowid AS fts_id, -bm25(books_fts) AS fts_rank FROM books_fts "
+        "WHERE books_fts MATCH :fts) fts ON fts.fts_id = b.id"
+    )
+    return join, None, "fts.fts_rank"
+
+
+def _filter_sql(
     conn: AsyncConnection,
+    params: dict,
     title: Optional[str] = None,
     author: Optional[str] = None,
     genre: Optional[str] = None,
     year_from: Optional[int] = None,
     year_to: Optional[int] = None,
-    sort_by: str = "title",
-    order: str = "asc",
-    limit: int = 10,
-    offset: int = 0,
-):
-    allowed_sort_fields = SortField
-    allowed_orders = SortOrder
-    sort_by = sort_by if sort_by in allowed_sort_fields else "title"
-    order = order if order in allowed_orders else "asc"
+    q: Optional[str] = None,
+) -> tuple[str, list, str | None]:
+    join = ""
     clauses = []
-    params = {}
+    rank = None
+    if q:
+        search = _search_sql(conn, q, params)
+        if search:
+            join, where, rank = search
+            if where:
+                clauses.append(where)
     if title:
-        clauses.append("b.title ILIKE :title")
+        clauses.append(f"b.title {_like(conn)} :title")
         params["title"] = f"%{title}%"
+    if author:
+        clauses.append(
+            "EXISTS (SELECT 1 FROM book_authors ba JOIN authors a ON a.id = ba.author_id "
+            f"WHERE ba.book_id = b.id AND a.name {_like(conn)} :author)"
+        )
+        params["author"] = f"%{author}%"
     if genre:
         clauses.append("b.genre = :genre")
         params["genre"] = genre
@@ -121,125 +411,621 @@ async def get_books(
     if year_to:
         clauses.append("b.published_year <= :year_to")
         params["year_to"] = year_to
-    base_where = " AND ".join(clauses) if clauses else "1=1"
-    if author:
-        sql = (
-            f"SELECT DISTINCT b.id, b.title, b.genre, b.published_year "
-            f"FROM books b "
-            f"JOIN book_authors ba ON ba.book_id = b.id "
-            f"JOIN authors a ON a.id = ba.author_id "
-            f"WHERE {base_where} AND a.name ILIKE :author "
-            f"ORDER BY {sort_by} {order} LIMIT :limit OFFSET :offset"
-        )
-        params.update({"author": f"%{author}%", "limit": limit, "offset": offset})
+    return join, clauses, rank
+
+
+async def get_books(
+    conn: AsyncConnection,
+    title: Optional[str] = None,
+    author: Optional[str] = None,
+    genre: Optional[str] = None,
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    sort_by: str = "title",
+    order: str = "asc",
+    limit: int = 10,
+    offset: int = 0,
+    after: Optional[tuple] = None,
+    q: Optional[str] = None,
+):
+    allowed_sort_fields = SortField
+    allowed_orders = SortOrder
+    sort_by = sort_by if sort_by in allowed_sort_fields else "title"
+    order = order if order in allowed_orders else "asc"
+    cache_key = await _list_cache_key({
+        "title": title, "author": author, "genre": genre, "year_from": year_from, "year_to": year_to,
+        "sort_by": sort_by, "order": order, "limit": limit, "offset": offset, "after": after, "q": q,
+    })
+    cached = await cache.get(cache_key)
+    if cached is not None:
+        return cached
+    params = {}
+    join, clauses, rank = _filter_sql(conn, params, title, author, genre, year_from, year_to, q)
+    if sort_by == "relevance" and rank is None:
+        sort_by = "title"
+    columns = "b.id, b.title, b.genre, b.published_year, b.version, b.updated_at, b.authors_json"
+    if rank is not None:
+        columns += f", {rank} AS search_rank"
+    if sort_by == "relevance":
+        if after is not None:
+            raise AppError("Cursor pagination is not available for relevance sort", status_code=status.HTTP_400_BAD_REQUEST)
+        order_sql = "ORDER BY search_rank DESC, b.id ASC"
     else:
-        sql = (
-            f"SELECT b.id, b.title, b.genre, b.published_year "
-            f"FROM books b WHERE {base_where} "
-            f"ORDER BY {sort_by} {order} LIMIT :limit OFFSET :offset"
-        )
-        params.update({"limit": limit, "offset": offset})
-    q = await conn.execute(text(sql), params)
-    books = [dict(r) for r in q.mappings().all()]
-    book_ids = [b["id"] for b in books]
-    authors_map = await _load_authors_for_book_ids(conn, book_ids)
-    for b in books:
-        b["authors"] = authors_map.get(b["id"], [])
+        sort_col = SORT_COLUMNS[sort_by]
+        order_sql = f"ORDER BY {sort_col} {order}, b.id {order}"
+        if after is not None:
+            # row comparison lets the (sort column, id) index seek straight to the next page
+            clauses.append(f"({sort_col}, b.id) {'>' if order == 'asc' else '<'} (:after_key, :after_id)")
+            params["after_key"], params["after_id"] = after
+    base_where = " AND ".join(clauses) if clauses else "1=1"
+    page_sql = (
+        f"SELECT {columns} "
+        f"FROM books b {join} WHERE {base_where} "
+        f"{order_sql} LIMIT :limit OFFSET :offset"
+    )
+    params.update({"limit": limit, "offset": offset})
+    r = await conn.execute(text(_select_books_sql(conn, page_sql, order_sql)), params)
+    books = [_row_to_book(row) for row in r.mappings().all()]
+    await cache.set(cache_key, books)
     return books
 
 
+async def _exact_count(conn: AsyncConnection, join: str, where: str, params: dict) -> int:
+    q = await conn.execute(text(f"SELECT COUNT(*) FROM books b {join} WHERE {where}"), params)
+    return q.scalar()
+
+
+async def _estimated_count(conn: AsyncConnection, join: str, where: str, params: dict) -> int:
+    q = await conn.execute(text(f"EXPLAIN (FORMAT JSON) SELECT 1 FROM books b {join} WHERE {where}"), params)
+    plan = q.scalar()
+    plan = json.loads(plan) if isinstance(plan, str) else plan
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def _count_cache_filters(conn: AsyncConnection, filters: dict) -> dict:
+    # only differences the query itself ignores are folded: unset filters, case under ILIKE, and
+    # anything in q besides its lower-cased words
+    normalized = {key: value for key, value in filters.items() if value not in (None, "")}
+    if conn.dialect.name == "postgresql":
+        for key in ("title", "author"):
+            if key in normalized:
+                normalized[key] = normalized[key].lower()
+    if "q" in normalized:
+        normalized["q"] = " ".join(re.findall(r"\w+", normalized["q"].lower()))
+    return normalized
+
+
+async def count_books(
+    conn: AsyncConnection,
+    strategy: str = "exact",
+    title: Optional[str] = None,
+    author: Optional[str] = None,
+    genre: Optional[str] = None,
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    q: Optional[str] = None,
+) -> tuple[int, str]:
+    """Count the books matching the list filters; returns the count and the strategy that produced it.
+
+    ``estimated`` reads the Postgres planner's row estimate and counts exactly when that is small or
+    when there is no planner to ask; ``cached`` reuses a recent count until the next write.
+    """
+    filters = {"title": title, "author": author, "genre": genre, "year_from": year_from, "year_to": year_to, "q": q}
+    cache_key = None
+    if strategy == "cached":
+        cache_key = await _list_cache_key({"count": True, **_count_cache_filters(conn, filters)})
+        cached = await cache.get(cache_key)
+        if cached is not None:
+            return cached, "cached"
+    params: dict = {}
+    join, clauses, _ = _filter_sql(conn, params, **filters)
+    where = " AND ".join(clauses) if clauses else "1=1"
+    if strategy == "estimated" and conn.dialect.name == "postgresql":
+        estimate = await _estimated_count(conn, join, where, params)
+        if estimate >= settings.total_count_estimate_threshold:
+            return estimate, "estimated"
+    total = await _exact_count(conn, join, where, params)
+    if cache_key is not None:
+        await cache.set(cache_key, total, ttl=settings.total_count_cache_ttl)
+    return total, "exact"
+
+
 async def get_book_by_id(conn: AsyncConnection, book_id: int):
-    q = await conn.execute(text("SELECT id, title, genre, published_year FROM books WHERE id = :id"), {"id": book_id})
+    cache_key = await _book_cache_key(book_id)
+    cached = await cache.get(cache_key)
+    if cached is not None:
+        return cached
+    page_sql = f"SELECT {PAGE_COLUMNS} FROM books WHERE id = :id"
+    q = await conn.execute(text(_select_books_sql(conn, page_sql)), {"id": book_id})
     row = q.mappings().first()
     if not row:
         return None
-    row_d = dict(row)
-    authors_map = await _load_authors_for_book_ids(conn, [book_id])
-    row_d["authors"] = authors_map.get(book_id, [])
-    return row_d
+    book = _row_to_book(row)
+    await cache.set(cache_key, book)
+    return book
 
 
-async def update_book(conn: AsyncConnection, book_id: int, data: dict):
-    book = await get_book_by_id(conn, book_id)
-    if not book:
-        return None
-    if "authors" in data:
-        authors_val = data["authors"]
-        if authors_val is None:
-            await conn.execute(text("DELETE FROM book_authors WHERE book_id = :id"), {"id": book_id})
+async def get_books_by_ids(conn: AsyncConnection, book_ids: List[int]) -> list[dict]:
+    book_ids = list(dict.fromkeys(book_ids))
+    if not book_ids:
+        return []
+    params: dict = {}
+    page_sql = f"SELECT {PAGE_COLUMNS} FROM books WHERE id IN ({_bind_list('g', book_ids, params)})"
+    q = await conn.execute(text(_select_books_sql(conn, page_sql)), params)
+    found = {book["id"]: book for book in (_row_to_book(row) for row in q.mappings().all())}
+    return [found[book_id] for book_id in book_ids if book_id in found]
+
+
+async def iter_books(conn: AsyncConnection, batch_size: int | None = None):
+    batch_size = batch_size or settings.export_batch_size
+    last_id = None
+    while True:
+        where = "WHERE id > :after " if last_id is not None else ""
+        page_sql = f"SELECT {PAGE_COLUMNS} FROM books {where}ORDER BY id LIMIT :limit"
+        q = await conn.execute(
+            text(_select_books_sql(conn, page_sql, "ORDER BY b.id")),
+            {"after": last_id, "limit": batch_size}
+        )
+        books = [_row_to_book(r) for r in q.mappings().all()]
+        if not books:
+            return
+        yield books
+        if len(books) < batch_size:
+            return
+        last_id = books[-1]["id"]
+
+
+async def _counted_facets(conn: AsyncConnection, top_authors: int) -> list:
+    q = await conn.execute(
+        text(
+            "SELECT facet, value, NULL AS name, count FROM book_facets WHERE facet IN ('genre', 'decade') AND count > 0 "
+            "UNION ALL SELECT 'author', f.value, a.name, f.count FROM ("
+            "SELECT value, count FROM book_facets WHERE facet = 'author' AND count > 0 "
+            "ORDER BY count DESC, value LIMIT :top) f JOIN authors a ON a.id = CAST(f.value AS INTEGER)"
+        ),
+        {"top": top_authors}
+    )
+    return q.mappings().all()
+
+
+async def _exact_facets(conn: AsyncConnection, top_authors: int, **filters) -> list:
+    params: dict = {"top": top_authors}
+    join, clauses, _ = _filter_sql(conn, params, **filters)
+    where = " AND ".join(clauses) if clauses else "1=1"
+    q = await conn.execute(
+        text(
+            f"WITH matched AS (SELECT b.id, b.genre, b.published_year FROM books b {join} WHERE {where}) "
+            "SELECT facet, value, NULL AS name, COUNT(*) AS count FROM ("
+            f"{_facet_rows_sql('matched')}) f GROUP BY facet, value "
+            "UNION ALL SELECT 'author', t.value, a.name, t.count FROM ("
+            "SELECT CAST(ba.author_id AS TEXT) AS value, COUNT(*) AS count FROM matched m "
+            "JOIN book_authors ba ON ba.book_id = m.id GROUP BY ba.author_id "
+            "ORDER BY count DESC, value LIMIT :top) t JOIN authors a ON a.id = CAST(t.value AS INTEGER)"
+        ),
+        params
+    )
+    return q.mappings().all()
+
+
+def _facet_stats(rows, source: str) -> dict:
+    genres, decades, authors = [], [], []
+    for row in rows:
+        if row["facet"] == "genre":
+            genres.append({"genre": row["value"], "count": row["count"]})
+        elif row["facet"] == "decade":
+            decades.append({"decade": int(row["value"]), "count": row["count"]})
         else:
-            if not isinstance(authors_val, list) or any(not isinstance(n, str) for n in authors_val):
-                raise AppError("Invalid authors format", status_code=status.HTTP_400_BAD_REQUEST, details={"authors": authors_val})
-            await conn.execute(text("DELETE FROM book_authors WHERE book_id = :id"), {"id": book_id})
-            for name in authors_val:
-                name = (name or "").strip()
-                if not name:
-                    continue
-                author_id = await _ensure_author_and_get_id(conn, name)
-                await _try_insert_book_author(conn, book_id, author_id)
-    if "title" in data and data["title"] is not None:
-        t = (data["title"] or "").strip()
+            authors.append({"id": int(row["value"]), "name": row["name"], "count": row["count"]})
+    return {
+        "total": sum(g["count"] for g in genres),
+        "genres": sorted(genres, key=lambda g: (-g["count"], g["genre"])),
+        "decades": sorted(decades, key=lambda d: d["decade"]),
+        "authors": sorted(authors, key=lambda a: (-a["count"], str(a["id"]))),
+        "source": source,
+    }
+
+
+async def get_book_stats(
+    conn: AsyncConnection,
+    title: Optional[str] = None,
+    author: Optional[str] = None,
+    genre: Optional[str] = None,
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    q: Optional[str] = None,
+    top_authors: int = 10,
+    exact: bool = False,
+) -> dict:
+    """Counts per genre, decade and top author; the whole catalog is read from the counters, filtered
+    subsets are grouped on the fly. Both are cached until the next write."""
+    filters = {"title": title, "author": author, "genre": genre, "year_from": year_from, "year_to": year_to, "q": q}
+    cache_key = await _list_cache_key({"stats": True, "top_authors": top_authors, "exact": exact, **filters})
+    cached = await cache.get(cache_key)
+    if cached is not None:
+        return cached
+    rows = None
+    if not exact and not any(filters.values()):
+        rows = await _counted_facets(conn, top_authors)
+    # counters that were never populated look like an empty catalog, so that case is recounted too
+    stats = _facet_stats(rows, "counters") if rows else _facet_stats(await _exact_facets(conn, top_authors, **filters), "exact")
+    await cache.set(cache_key, stats)
+    return stats
+
+
+async def recompute_facets(conn: AsyncConnection) -> dict:
+    """Rebuild the facet counters from books and book_authors; returns how many counters had drifted."""
+    q = await conn.execute(text("SELECT facet, value, count FROM book_facets WHERE count <> 0"))
+    before = {(r["facet"], r["value"]): r["count"] for r in q.mappings().all()}
+    await conn.execute(text("DELETE FROM book_facets"))
+    await conn.execute(text(
+        "INSERT INTO book_facets (facet, value, count) SELECT facet, value, COUNT(*) FROM ("
+        f"{_facet_rows_sql('books', 'book_authors')}) f GROUP BY facet, value"
+    ))
+    q = await conn.execute(text("SELECT facet, value, count FROM book_facets"))
+    after = {(r["facet"], r["value"]): r["count"] for r in q.mappings().all()}
+    await commit_changes(conn)
+    await invalidate_books()
+    return {"counters": len(after), "drifted": sum(1 for key in before.keys() | after.keys() if before.get(key) != after.get(key))}
+
+
+def _prepare_update(data: dict) -> dict:
+    fields: dict = {}
+    if data.get("title") is not None:
+        t = data["title"].strip()
         if not t:
             raise AppError("Invalid title", status_code=status.HTTP_400_BAD_REQUEST)
-        await conn.execute(text("UPDATE books SET title = :t WHERE id = :id"), {"t": t, "id": book_id})
-    if "genre" in data and data["genre"] is not None:
-        g = data["genre"]
-        await conn.execute(text("UPDATE books SET genre = :g WHERE id = :id"), {"g": g, "id": book_id})
-    if "published_year" in data and data["published_year"] is not None:
+        fields["title"] = t
+    if data.get("genre") is not None:
+        fields["genre"] = data["genre"]
+    if data.get("published_year") is not None:
         try:
-            y = int(data["published_year"])
+            fields["published_year"] = int(data["published_year"])
         except Exception:
             raise AppError("Invalid published_year", status_code=status.HTTP_400_BAD_REQUEST)
-        await conn.execute(text("UPDATE books SET published_year = :y WHERE id = :id"), {"y": y, "id": book_id})
-    await conn.commit()
-    return await get_book_by_id(conn, book_id)
+    if "authors" in data:
+        authors_val = data["authors"]
+        if authors_val is not None and (not isinstance(authors_val, list) or any(not isinstance(n, str) for n in authors_val)):
+            raise AppError("Invalid authors format", status_code=status.HTTP_400_BAD_REQUEST, details={"authors": authors_val})
+        fields["authors"] = _clean_author_names(authors_val or [])
+    if not fields:
+        raise AppError("No fields provided for update", status_code=status.HTTP_400_BAD_REQUEST)
+    return fields
+
+
+async def _replace_book_authors(conn: AsyncConnection, authors_by_book: dict[int, list]):
+    """Make book_authors hold exactly the given authors for each book; links that stay are not rewritten."""
+    params: dict = {}
+    ids_sql = _bind_list("rb", list(authors_by_book), params)
+    pairs = [(book_id, a["id"]) for book_id, authors in authors_by_book.items() for a in authors]
+    keep = ""
+    if pairs:
+        values = []
+        for i, (book_id, author_id) in enumerate(pairs):
+            values.append(f"(:kb{i}, :ka{i})")
+            params.update({f"kb{i}": book_id, f"ka{i}": author_id})
+        keep = f" AND (book_id, author_id) NOT IN (VALUES {', '.join(values)})"
+    await conn.execute(text(f"DELETE FROM book_authors WHERE book_id IN ({ids_sql}){keep}"), params)
+    await _insert_book_authors(conn, [{"b": book_id, "a": author_id} for book_id, author_id in pairs])
+
+
+async def _apply_updates(conn: AsyncConnection, updates: list[tuple[int, dict]]) -> dict[int, dict]:
+    # author ids are resolved up front, so the new authors_json is part of the one UPDATE below
+    author_ids = await resolve_author_ids(
+        conn, [name for _, fields in updates if "authors" in fields for name in fields["authors"]]
+    )
+    columns = [
+        fields if "authors" not in fields else fields | {
+            "authors_json": _authors_json([{"id": author_ids[name], "name": name} for name in fields["authors"]])
+        }
+        for _, fields in updates
+    ]
+    params: dict = {}
+    for i, (book_id, _) in enumerate(updates):
+        params[f"id{i}"] = book_id
+    assignments = []
+    # one CASE per column touched by any item, so the whole batch is a single UPDATE
+    for column in ("title", "genre", "published_year", "authors_json"):
+        whens = []
+        for i, fields in enumerate(columns):
+            if column in fields:
+                whens.append(f"WHEN :id{i} THEN :{column}{i}")
+                params[f"{column}{i}"] = fields[column]
+        if whens:
+            assignments.append(f"{column} = CASE id {' '.join(whens)} ELSE {column} END")
+    assignments += ["version = version + 1", "updated_at = CURRENT_TIMESTAMP"]
+    ids_sql = ", ".join(f":id{i}" for i in range(len(updates)))
+    # facet counters: take the affected books out before the change and add them back afterwards
+    refaceted = await _lock_books(
+        conn, [book_id for book_id, fields in updates if {"genre", "published_year", "authors"} & fields.keys()]
+    )
+    await _adjust_facets(conn, refaceted, -1)
+    # SQLite only resolves the bare table name inside RETURNING, not an alias
+    r = await conn.execute(
+        text(
+            f"UPDATE books SET {', '.join(assignments)} WHERE id IN ({ids_sql}) "
+            f"RETURNING {BOOK_COLUMNS}, {_authors_sql(conn, 'books.id', 'books.authors_json')} AS authors"
+        ),
+        params
+    )
+    books = {book["id"]: book for book in (_row_to_book(row) for row in r.mappings().all())}
+    if not books:
+        await rollback_changes(conn)
+        return {}
+    fields_by_id = dict(updates)
+    author_changes = {
+        book_id: book["authors"] for book_id, book in books.items() if "authors" in fields_by_id[book_id]
+    }
+    if author_changes:
+        await _replace_book_authors(conn, author_changes)
+    await _adjust_facets(conn, [book_id for book_id in refaceted if book_id in books], 1)
+    await _refresh_search_index(
+        conn, [book_id for book_id in books if {"title", "authors"} & fields_by_id[book_id].keys()]
+    )
+    await _touch_catalog(conn)
+    await commit_changes(conn)
+    await invalidate_books(list(books))
+    return books
+
+
+async def update_book(conn: AsyncConnection, book_id: int, data: dict):
+    books = await _apply_updates(conn, [(book_id, _prepare_update(data))])
+    return books.get(book_id)
+
+
+async def update_books(conn: AsyncConnection, items: list[dict]) -> list[dict]:
+    results = []
+    updates = []
+    seen = set()
+    for item in items:
+        book_id = item["id"]
+        if book_id in seen:
+            results.append({"id": book_id, "status": "invalid", "error": "Duplicate id in batch"})
+            continue
+        seen.add(book_id)
+        try:
+            updates.append((book_id, _prepare_update(item)))
+        except AppError as e:
+            results.append({"id": book_id, "status": "invalid", "error": e.message})
+            continue
+        results.append({"id": book_id, "status": None})
+    books = await _apply_updates(conn, updates) if updates else {}
+    for result in results:
+        if result["status"] is None:
+            book = books.get(result["id"])
+            result.update({"status": "updated", "book": book} if book else {"status": "not_found"})
+    return results
 
 
 async def delete_book(conn: AsyncConnection, book_id: int) -> bool:
-    exists = await get_book_by_id(conn, book_id)
-    if not exists:
-        return False
-    await conn.execute(text("DELETE FROM book_authors WHERE book_id = :id"), {"id": book_id})
-    await conn.execute(text("DELETE FROM books WHERE id = :id"), {"id": book_id})
-    await conn.commit()
-    return True
+    result = await delete_books(conn, [book_id])
+    return bool(result["deleted"])
+
+
+async def delete_books(conn: AsyncConnection, book_ids: List[int]) -> dict:
+    book_ids = list(dict.fromkeys(book_ids))
+    if not book_ids:
+        return {"deleted": [], "not_found": []}
+    # a book deleted concurrently is gone once its lock is granted, so its facets are not taken out twice
+    await _adjust_facets(conn, await _lock_books(conn, book_ids), -1)
+    params: dict = {}
+    # book_authors rows go with their book through ON DELETE CASCADE
+    r = await conn.execute(
+        text(f"DELETE FROM books WHERE id IN ({_bind_list('d', book_ids, params)}) RETURNING id"),
+        params
+    )
+    deleted = {row[0] for row in r.fetchall()}
+    if not deleted:
+        await rollback_changes(conn)
+        return {"deleted": [], "not_found": book_ids}
+    await _remove_from_search_index(conn, list(deleted))
+    await _touch_catalog(conn)
+    await commit_changes(conn)
+    await invalidate_books(list(deleted))
+    return {
+        "deleted": [i for i in book_ids if i in deleted],
+        "not_found": [i for i in book_ids if i not in deleted],
+    }
+
+
+async def rename_author(conn: AsyncConnection, author_id: int, name: str) -> dict | None:
+    name = (name or "").strip()
+    if not name:
+        raise AppError("Invalid author name", status_code=status.HTTP_400_BAD_REQUEST)
+    q = await conn.execute(text("SELECT id FROM authors WHERE name = :name"), {"name": name})
+    existing = q.scalar()
+    if existing is not None and existing != author_id:
+        raise AppError(
+            "Author with this name already exists",
+            status_code=status.HTTP_409_CONFLICT,
+            details={"name": name, "author_id": existing}
+        )
+    r = await conn.execute(
+        text("UPDATE authors SET name = :name WHERE id = :id RETURNING id, name"), {"id": author_id, "name": name}
+    )
+    author = r.mappings().first()
+    if not author:
+        await rollback_changes(conn)
+        return None
+    r = await conn.execute(
+        text(
+            f"UPDATE books SET authors_json = {_authors_agg_sql(conn, 'books.id')}, "
+            "version = version + 1, updated_at = CURRENT_TIMESTAMP "
+            "WHERE id IN (SELECT book_id FROM book_authors WHERE author_id = :id) RETURNING id"
+        ),
+        {"id": author_id}
+    )
+    book_ids = [row[0] for row in r.fetchall()]
+    await _refresh_search_index(conn, book_ids)
+    await _touch_catalog(conn)
+    await commit_changes(conn)
+    _author_ids.clear()
+    await cache.bump(AUTHORS_CACHE_GENERATION)
+    await invalidate_books(book_ids)
+    return {"id": author["id"], "name": author["name"], "books": len(book_ids)}
+
+
+async def backfill_authors_json(conn: AsyncConnection, batch_size: int | None = None, only_missing: bool = True) -> int:
+    """Fill books.authors_json from the join, one committed id range at a time."""
+    batch_size = batch_size or settings.export_batch_size
+    missing = " AND authors_json IS NULL" if only_missing else ""
+    last_id = 0
+    total = 0
+    while True:
+        r = await conn.execute(
+            text(
+                f"UPDATE books SET authors_json = {_authors_agg_sql(conn, 'books.id')} WHERE id IN ("
+                f"SELECT id FROM books WHERE id > :after{missing} ORDER BY id LIMIT :limit) RETURNING id"
+            ),
+            {"after": last_id, "limit": batch_size}
+        )
+        book_ids = [row[0] for row in r.fetchall()]
+        await conn.commit()
+        if not book_ids:
+            return total
+        total += len(book_ids)
+        last_id = max(book_ids)
+
+
+def _load_authors(value) -> list:
+    return json.loads(value) if isinstance(value, str) else list(value or [])
+
+
+async def check_authors_json(conn: AsyncConnection, repair: bool = False, batch_size: int | None = None) -> dict:
+    """Compare books.authors_json with the join; with ``repair`` rewrite the rows that are missing or differ."""
+    batch_size = batch_size or settings.export_batch_size
+    missing = []
+    mismatched = []
+    checked = 0
+    last_id = 0
+    while True:
+        q = await conn.execute(
+            text(
+                f"SELECT b.id, b.authors_json AS stored, {_authors_agg_sql(conn)} AS actual "
+                "FROM books b WHERE b.id > :after ORDER BY b.id LIMIT :limit"
+            ),
+            {"after": last_id, "limit": batch_size}
+        )
+        rows = q.mappings().all()
+        if not rows:
+            break
+        for row in rows:
+            if row["stored"] is None:
+                missing.append(row["id"])
+            elif _load_authors(row["stored"]) != _load_authors(row["actual"]):
+                mismatched.append(row["id"])
+        checked += len(rows)
+        last_id = rows[-1]["id"]
+    repaired = 0
+    if repair and (missing or mismatched):
+        book_ids = missing + mismatched
+        for start in range(0, len(book_ids), batch_size):
+            params: dict = {}
+            ids_sql = _bind_list("r", book_ids[start:start + batch_size], params)
+            await conn.execute(
+                text(f"UPDATE books SET authors_json = {_authors_agg_sql(conn, 'books.id')} WHERE id IN ({ids_sql})"),
+                params
+            )
+        await conn.commit()
+        if mismatched:
+            await invalidate_books(mismatched)
+        repaired = len(book_ids)
+    return {
+        "checked": checked,
+        "missing": len(missing),
+        "mismatched": len(mismatched),
+        "repaired": repaired,
+        "sample": (mismatched + missing)[:20],
+    }
+
+
+def validate_import_row(data) -> dict:
+    if not isinstance(data, dict):
+        raise AppError("Invalid book", status_code=status.HTTP_400_BAD_REQUEST, details={"book": data})
+    title = (data.get("title") or "").strip()
+    if not title:
+        raise AppError("Invalid title", status_code=status.HTTP_400_BAD_REQUEST, details={"book": data})
+    # every column the multi-row INSERT needs is checked here, so that one bad row is rejected on its own
+    # instead of failing the statement for its whole batch
+    py = data.get("published_year")
+    if py is None or py == "":
+        raise AppError("Missing published_year", status_code=status.HTTP_400_BAD_REQUEST, details={"book": data})
+    try:
+        published_year = int(py)
+    except Exception:
+        raise AppError(f"Invalid published_year: {py}", status_code=status.HTTP_400_BAD_REQUEST, details={"book": data})
+    if not (1800 <= published_year <= datetime.datetime.now().year):
+        raise AppError(f"Invalid published_year: {py}", status_code=status.HTTP_400_BAD_REQUEST, details={"book": data})
+    try:
+        genre = Genre(data.get("genre")).value
+    except ValueError:
+        raise AppError(f"Invalid genre: {data.get('genre')}", status_code=status.HTTP_400_BAD_REQUEST, details={"book": data})
+    return {
+        "title": title,
+        "genre": genre,
+        "published_year": published_year,
+        "authors": _clean_author_names(data.get("authors")),
+    }
+
+
+# _insert_books_batch binds 4 parameters per row, and asyncpg allows at most 32767 per statement
+MAX_IMPORT_BATCH_SIZE = 8000
+
+
+async def _insert_books_batch(conn: AsyncConnection, batch: list[dict]) -> list[dict]:
+    author_ids = await resolve_author_ids(conn, [name for book in batch for name in book["authors"]])
+    authors_lists = [[{"id": author_ids[name], "name": name} for name in book["authors"]] for book in batch]
+    params: dict = {}
+    values = []
+    for i, (book, authors_list) in enumerate(zip(batch, authors_lists)):
+        values.append(f"(:title{i}, :genre{i}, :year{i}, :authors{i})")
+        params.update({
+            f"title{i}": book["title"], f"genre{i}": book["genre"], f"year{i}": book["published_year"],
+            f"authors{i}": _authors_json(authors_list),
+        })
+    r = await conn.execute(
+        text(
+            f"INSERT INTO books (title, genre, published_year, authors_json) VALUES {', '.join(values)} "
+            "RETURNING id, version, updated_at"
+        ),
+        params
+    )
+    # ids are handed out in VALUES order on both Postgres and SQLite, but RETURNING order is not guaranteed
+    rows = sorted(r.mappings().all(), key=lambda row: row["id"])
+    book_ids = [row["id"] for row in rows]
+    links = []
+    created = []
+    for row, book, authors_list in zip(rows, batch, authors_lists):
+        book_id = row["id"]
+        links += [{"b": book_id, "a": author["id"]} for author in authors_list]
+        created.append({
+            **book,
+            "id": book_id,
+            "version": row["version"],
+            "updated_at": _timestamp(row["updated_at"]),
+            "authors": authors_list,
+        })
+    await _insert_book_authors(conn, links)
+    await _adjust_facets(conn, book_ids, 1)
+    await _refresh_search_index(conn, book_ids)
+    return created
 
 
-async def bulk_create_books(conn: AsyncConnection, books_data: list[dict]):
+async def bulk_create_books(conn: AsyncConnection, books_data: list[dict], batch_size: int | None = None, commit: bool = True):
     if not books_data:
         raise AppError("No books provided for import", status_code=status.HTTP_400_BAD_REQUEST)
+    batch_size = batch_size or settings.import_batch_size
     created = []
     try:
-        for data in books_data:
-            title = (data.get("title") or "").strip()
-            if not title:
-                raise AppError("Invalid title", status_code=status.HTTP_400_BAD_REQUEST, details={"book": data})
-            py = data.get("published_year")
-            published_year = None
-            if py is not None and py != "":
-                try:
-                    published_year = int(py)
-                except Exception:
-                    raise AppError(f"Invalid published_year: {py}", status_code=status.HTTP_400_BAD_REQUEST, details={"book": data})
-            genre = data.get("genre")
-            r = await conn.execute(
-                text("INSERT INTO books (title, genre, published_year) VALUES (:title, :genre, :year) RETURNING id"),
-                {"title": title, "genre": genre, "year": published_year},
-            )
-            book_id = r.scalar_one()
-            authors_list = []
-            for name in data.get("authors", []):
-                name = (name or "").strip()
-                if not name:
-                    continue
-                author_id = await _ensure_author_and_get_id(conn, name)
-                await _try_insert_book_author(conn, book_id, author_id)
-                authors_list.append({"id": author_id, "name": name})
-            created.append({"id": book_id, "title": title, "genre": genre, "published_year": published_year, "authors": authors_list})
-        await conn.commit()
+        for start in range(0, len(books_data), batch_size):
+            batch = [validate_import_row(data) for data in books_data[start:start + batch_size]]
+            created.extend(await _insert_books_batch(conn, batch))
+        await _touch_catalog(conn)
+        if commit:
+            await commit_changes(conn)
+            await invalidate_books()
     except AppError:
         raise
     except Exception as e:
-        await conn.rollback()
+        await rollback_changes(conn)
         raise AppError("Database error while bulk creating books", status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, details={"reason": str(e)})
     return created
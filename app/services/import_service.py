@@ -0,0 +1,168 @@
+import codecs
+import csv
+import json
+from typing import AsyncIterator
+from fastapi import UploadFile, status
+from sqlalchemy.ext.asyncio import AsyncConnection
+from app.config import settings
+from app.errors import AppError
+from app.services import book_service
+
+MAX_REPORTED_ERRORS = 20
+MAX_JSON_ITEM_SIZE = 1024 * 1024
+_WHITESPACE = " \t\r\n"
+
+
+async def _iter_text(file: UploadFile, chunk_size: int) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        decoded = decoder.decode(chunk)
+        if decoded:
+            yield decoded
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def _csv_row_to_book(fieldnames: list, row: list) -> dict:
+    data = dict(zip(fieldnames, row))
+    for name in fieldnames[len(row):]:
+        data[name] = None
+    if isinstance(data.get("authors"), str):
+        data["authors"] = [a.strip() for a in data["authors"].split(";") if a.strip()]
+    return data
+
+
+async def iter_csv_rows(file: UploadFile, chunk_size: int) -> AsyncIterator[dict]:
+    fieldnames = None
+    pending = ""
+    record_lines: list = []
+    quotes = 0
+    eof = False
+    chunks = _iter_text(file, chunk_size)
+    while not eof:
+        try:
+            lines = (pending + await anext(chunks)).split("\n")
+            pending = lines.pop()
+        except StopAsyncIteration:
+            eof = True
+            lines = [pending]
+        records = []
+        for line in lines:
+            record_lines.append(line)
+            quotes += line.count('"')
+            # a newline only ends a record when it is not inside a quoted field
+            if quotes % 2 == 0 or eof:
+                records.append("\n".join(record_lines))
+                record_lines = []
+                quotes = 0
+        for row in csv.reader(records):
+            if not row:
+                continue
+            if fieldnames is None:
+                fieldnames = row
+                continue
+            yield _csv_row_to_book(fieldnames, row)
+
+
+def _skip_whitespace(buffer: str, pos: int) -> int:
+    while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+        pos += 1
+    return pos
+
+
+def _invalid_json(reason: str) -> AppError:
+    return AppError("Invalid JSON import file", status_code=status.HTTP_400_BAD_REQUEST, details={"reason": reason})
+
+
+async def iter_json_items(file: UploadFile, chunk_size: int) -> AsyncIterator:
+    decoder = json.JSONDecoder()
+    buffer = ""
+    state = "start"
+    eof = False
+    chunks = _iter_text(file, chunk_size)
+    while state != "done":
+        try:
+            buffer += await anext(chunks)
+        except StopAsyncIteration:
+            eof = True
+        pos = 0
+        while True:
+            pos = _skip_whitespace(buffer, pos)
+            if pos >= len(buffer):
+                break
+            if state == "start":
+                if buffer[pos] != "[":
+                    raise _invalid_json("expected a JSON array of books")
+                pos += 1
+                state = "first"
+            elif state in ("first", "value"):
+                if state == "first" and buffer[pos] == "]":
+                    state = "done"
+                    break
+                try:
+                    item, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError as e:
+                    if eof or len(buffer) - pos > MAX_JSON_ITEM_SIZE:
+                        raise _invalid_json(str(e))
+                    break
+                # a value touching the end of the buffer may be a truncated number or literal
+                if end == len(buffer) and not eof:
+                    break
+                yield item
+                pos = end
+                state = "sep"
+            elif state == "sep":
+                if buffer[pos] == ",":
+                    state = "value"
+                elif buffer[pos] == "]":
+                    state = "done"
+                    break
+                else:
+                    raise _invalid_json(f"unexpected character {buffer[pos]!r}")
+                pos += 1
+        buffer = buffer[pos:]
+        if eof and state != "done":
+            raise _invalid_json("unexpected end of file")
+
+
+async def import_books_stream(
+    conn: AsyncConnection,
+    file: UploadFile,
+    file_format: str,
+    batch_size: int | None = None,
+    commit_per_batch: bool = False,
+) -> dict:
+    batch_size = batch_size or settings.import_batch_size
+    chunk_size = settings.import_chunk_size
+    rows = iter_json_items(file, chunk_size) if file_format == "json" else iter_csv_rows(file, chunk_size)
+    imported = 0
+    rejected = 0
+    errors = []
+    batch = []
+    row_number = 0
+    async for data in rows:
+        row_number += 1
+        try:
+            batch.append(book_service.validate_import_row(data))
+        except AppError as e:
+            rejected += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({"row": row_number, "error": e.message, "details": e.details})
+            continue
+        if len(batch) >= batch_size:
+            await book_service.bulk_create_books(conn, batch, batch_size=batch_size, commit=commit_per_batch)
+            imported += len(batch)
+            batch = []
+    if row_number == 0:
+        raise AppError("No books provided for import", status_code=status.HTTP_400_BAD_REQUEST)
+    if batch:
+        await book_service.bulk_create_books(conn, batch, batch_size=batch_size, commit=commit_per_batch)
+        imported += len(batch)
+    if not commit_per_batch:
+        await book_service.commit_changes(conn)
+        await book_service.invalidate_books()
+    return {"imported": imported, "rejected": rejected, "errors": errors}
@@ -1,14 +1,42 @@
+import pytest
 import pytest_asyncio
 from httpx import AsyncClient
 from httpx._transports.asgi import ASGITransport
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
 from app.main import app
 from app import models
-from app.db import get_conn
+from app.db import get_conn, get_read_conn, get_read_connector, enable_sqlite_foreign_keys
+from app.metrics import instrument_engine
+from app.query_budget import watch_engine, query_budget as query_budget_block
 
 TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
 
 engine_test: AsyncEngine = create_async_engine(TEST_DATABASE_URL, future=True, echo=False)
+enable_sqlite_foreign_keys(engine_test)
+instrument_engine(engine_test)
+watch_engine(engine_test)
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "query_budget(max_statements): fail if the test body runs more SQL statements"
+    )
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    # wraps only the call phase, so statements issued by fixture setup are not counted
+    marker = item.get_closest_marker("query_budget")
+    if marker is None:
+        yield
+        return
+    with query_budget_block(*marker.args, label=item.nodeid, **marker.kwargs):
+        yield
+
+
+@pytest.fixture
+def query_budget():
+    return query_budget_block
 
 
 @pytest_asyncio.fixture(scope="session", autouse=True)
@@ -26,6 +54,8 @@ async def override_get_conn():
 
 
 app.dependency_overrides[get_conn] = override_get_conn
+app.dependency_overrides[get_read_conn] = override_get_conn
+app.dependency_overrides[get_read_connector] = lambda: engine_test.connect
 
 
 @pytest_asyncio.fixture
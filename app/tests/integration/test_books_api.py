@@ -1,3 +1,4 @@
+import json
 import pytest
 
 @pytest.mark.asyncio
@@ -40,3 +41,287 @@ async def test_books_crud(client_fixture):
     resp = await client_fixture.delete(f"/books/{book_id}", headers=headers)
     assert resp.status_code == 200
     assert resp.json().get("message") == "Book deleted"
+
+
+@pytest.mark.asyncio
+async def test_export_streams_all_batches(client_fixture, db_conn, monkeypatch):
+    from app.config import settings
+    from app.services import book_service
+    monkeypatch.setattr(settings, "export_batch_size", 2)
+    await book_service.bulk_create_books(db_conn, [
+        {"title": f"Export {i}", "genre": "History", "published_year": 1950 + i, "authors": ["Exporter", f"E{i}"]}
+        for i in range(5)
+    ])
+
+    resp = await client_fixture.get("/books/export?format=json")
+    assert resp.status_code == 200
+    rows = resp.json()
+    exported = [r for r in rows if r["title"].startswith("Export ")]
+    assert len(exported) == 5
+    assert [r["id"] for r in rows] == sorted(r["id"] for r in rows)
+    assert all("Exporter" in r["authors"].split(";") for r in exported)
+
+    resp = await client_fixture.get("/books/export?format=csv")
+    assert resp.status_code == 200
+    lines = resp.text.strip().splitlines()
+    assert lines[0].strip() == "id,title,genre,published_year,authors"
+    assert len(lines) == len(rows) + 1
+
+
+@pytest.mark.asyncio
+async def test_list_books_cursor_pagination(client_fixture):
+    resp = await client_fixture.get("/books/", params={"limit": 1})
+    assert resp.status_code == 200
+    first = resp.json()
+    next_cursor = resp.headers["X-Next-Cursor"]
+
+    resp = await client_fixture.get("/books/", params={"limit": 1, "cursor": next_cursor})
+    assert resp.status_code == 200
+    assert len(resp.json()) == 1
+    assert resp.json()[0]["id"] != first[0]["id"]
+
+    resp = await client_fixture.get("/books/", params={"skip": 1, "cursor": next_cursor})
+    assert resp.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_conditional_gets(client_fixture, db_conn):
+    from app.services import book_service
+    book = await book_service.create_book(db_conn, "Conditional", "Science", 2003, ["Etag Author"])
+
+    resp = await client_fixture.get(f"/books/{book['id']}")
+    assert resp.status_code == 200
+    etag = resp.headers["ETag"]
+    resp = await client_fixture.get(f"/books/{book['id']}", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.content == b""
+    resp = await client_fixture.get(f"/books/{book['id']}", headers={"If-Modified-Since": resp.headers["Last-Modified"]})
+    assert resp.status_code == 304
+
+    await book_service.update_book(db_conn, book["id"], {"authors": ["Another Etag Author"]})
+    resp = await client_fixture.get(f"/books/{book['id']}", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["ETag"] != etag
+
+    resp = await client_fixture.get("/books/", params={"genre": "Science"})
+    list_etag = resp.headers["ETag"]
+    resp = await client_fixture.get("/books/", params={"genre": "Science"}, headers={"If-None-Match": list_etag})
+    assert resp.status_code == 304
+    await book_service.create_book(db_conn, "Conditional 2", "Science", 2004, ["Etag Author"])
+    resp = await client_fixture.get("/books/", params={"genre": "Science"}, headers={"If-None-Match": list_etag})
+    assert resp.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_bulk_delete(client_fixture, db_conn):
+    from app.services import book_service
+    created = await book_service.bulk_create_books(db_conn, [
+        {"title": f"Cleanup {i}", "genre": "Fiction", "published_year": 2001, "authors": ["Cleanup Author"]}
+        for i in range(3)
+    ])
+    ids = [b["id"] for b in created]
+
+    resp = await client_fixture.post("/auth/register", json={
+        "username": "cleaner", "password": "secret123", "email": "cleaner@test.com"
+    })
+    headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+    resp = await client_fixture.request("DELETE", "/books/", json={"ids": ids + [999999]}, headers=headers)
+    assert resp.status_code == 200
+    assert resp.json() == {"deleted": ids, "not_found": [999999]}
+    resp = await client_fixture.get(f"/books/{ids[0]}")
+    assert resp.status_code == 404
+
+    resp = await client_fixture.request("DELETE", "/books/", json={"ids": []}, headers=headers)
+    assert resp.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_batch_get_and_patch(client_fixture, db_conn):
+    from app.services import book_service
+    created = await book_service.bulk_create_books(db_conn, [
+        {"title": f"Batch API {i}", "genre": "History", "published_year": 1999, "authors": ["Batch API Author"]}
+        for i in range(2)
+    ])
+    ids = [b["id"] for b in created]
+
+    resp = await client_fixture.post("/books/batch-get", json={"ids": ids + [999999]})
+    assert resp.status_code == 200
+    assert [b["id"] for b in resp.json()["books"]] == ids
+    assert resp.json()["not_found"] == [999999]
+
+    resp = await client_fixture.post("/auth/register", json={
+        "username": "patcher", "password": "secret123", "email": "patcher@test.com"
+    })
+    headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+    resp = await client_fixture.patch("/books/batch", json={"items": [
+        {"id": ids[0], "genre": "Science"},
+        {"id": 999999, "title": "Missing"},
+    ]}, headers=headers)
+    assert resp.status_code == 200
+    results = resp.json()
+    assert results[0]["status"] == "updated"
+    assert results[0]["book"]["genre"] == "Science"
+    assert results[1] == {"id": 999999, "status": "not_found", "book": None, "error": None}
+
+
+@pytest.mark.asyncio
+async def test_read_query_budgets(client_fixture, db_conn, query_budget):
+    from app.cache import cache
+    from app.services import book_service
+    book = await book_service.create_book(db_conn, "Budget Read", "History", 2004, ["Budget Reader"])
+    await cache.clear()
+
+    with query_budget(1, label="GET /books/{book_id}"):
+        resp = await client_fixture.get(f"/books/{book['id']}")
+    assert resp.status_code == 200
+    with query_budget(2, label="GET /books/"):
+        resp = await client_fixture.get("/books/", params={"limit": 5})
+    assert resp.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_list_rate_limit_is_per_user(client_fixture, monkeypatch):
+    from app.limiter import limiter, parse_rate
+    monkeypatch.setitem(limiter.overrides, "list_books", parse_rate("2/minute"))
+    resp = await client_fixture.post("/auth/register", json={
+        "username": "throttled", "password": "secret123", "email": "throttled@example.com"
+    })
+    headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+    statuses = []
+    for _ in range(3):
+        resp = await client_fixture.get("/books/", headers=headers)
+        statuses.append(resp.status_code)
+    assert statuses == [200, 200, 429]
+    assert resp.headers["X-RateLimit-Remaining"] == "0"
+    assert int(resp.headers["Retry-After"]) > 0
+    assert resp.json()["details"] == {"limit": "2/minute"}
+
+    resp = await client_fixture.get("/books/")
+    assert resp.status_code == 200
+    assert resp.headers["X-RateLimit-Limit"] == "2"
+    await limiter.store.reset()
+
+
+@pytest.mark.asyncio
+async def test_fast_responses_match_validated_output(client_fixture, db_conn, monkeypatch):
+    from app.config import settings
+    from app.services import book_service
+    await book_service.bulk_create_books(db_conn, [
+        {"title": "Fast Ünïcode", "genre": "Non-Fiction", "published_year": 1999, "authors": ["Fast A", "Fast B"]},
+        {"title": "Fast Plain", "genre": "Science", "published_year": 2001, "authors": ["Fast A"]},
+    ])
+    book_id = None
+
+    bodies = {}
+    for fast in (True, False):
+        monkeypatch.setattr(settings, "fast_responses", fast)
+        listing = await client_fixture.get("/books/", params={"title": "Fast", "limit": 1})
+        assert listing.status_code == 200
+        assert "X-Next-Cursor" in listing.headers and "ETag" in listing.headers
+        assert listing.headers["content-type"] == "application/json"
+        book_id = book_id or listing.json()[0]["id"]
+        single = await client_fixture.get(f"/books/{book_id}")
+        assert "ETag" in single.headers
+        batch = await client_fixture.post("/books/batch-get", json={"ids": [book_id, 999999]})
+        bodies[fast] = (listing.json(), single.json(), batch.json())
+
+    assert bodies[True] == bodies[False]
+
+
+@pytest.mark.asyncio
+async def test_rename_author(client_fixture):
+    resp = await client_fixture.post("/auth/register", json={
+        "username": "renamer", "password": "secret123", "email": "renamer@example.com"
+    })
+    headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+    resp = await client_fixture.post("/books/", json={
+        "title": "Pen Names", "genre": "Fiction", "published_year": 2010, "authors": ["Before Rename", "Other Pen"]
+    }, headers=headers)
+    book_id = resp.json()["id"]
+    author_id = next(a["id"] for a in resp.json()["authors"] if a["name"] == "Before Rename")
+
+    resp = await client_fixture.patch(f"/authors/{author_id}", json={"name": "After Rename"})
+    assert resp.status_code == 401
+    resp = await client_fixture.patch(f"/authors/{author_id}", json={"name": "After Rename"}, headers=headers)
+    assert resp.status_code == 200
+    assert resp.json() == {"id": author_id, "name": "After Rename", "books": 1}
+    resp = await client_fixture.get(f"/books/{book_id}")
+    assert {"id": author_id, "name": "After Rename"} in resp.json()["authors"]
+
+    resp = await client_fixture.patch(f"/authors/{author_id}", json={"name": "Other Pen"}, headers=headers)
+    assert resp.status_code == 409
+    resp = await client_fixture.patch("/authors/999999", json={"name": "Nobody"}, headers=headers)
+    assert resp.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_book_stats(client_fixture, db_conn):
+    from app.services import book_service
+    await book_service.bulk_create_books(db_conn, [
+        {"title": "Facet Api", "genre": "Science", "published_year": 1955, "authors": ["Facet Api Author"]},
+    ])
+    resp = await client_fixture.get("/books/stats")
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["total"] == sum(g["count"] for g in body["genres"])
+    assert body["source"] in ("counters", "exact")
+
+    resp = await client_fixture.get("/books/stats", params={"title": "Facet Api", "top_authors": 1})
+    assert resp.json()["authors"] == [{"id": resp.json()["authors"][0]["id"], "name": "Facet Api Author", "count": 1}]
+
+    resp = await client_fixture.get("/books/", params={"title": "Facet Api", "include_facets": "true"})
+    assert resp.status_code == 200
+    facets = json.loads(resp.headers["X-Facets"])
+    assert facets["total"] == 1 and facets["decades"] == [{"decade": 1950, "count": 1}]
+
+
+@pytest.mark.asyncio
+async def test_list_total_count(client_fixture, db_conn):
+    from app.services import book_service
+    await book_service.bulk_create_books(db_conn, [
+        {"title": f"Totals {i}", "genre": "History", "published_year": 1900 + i, "authors": ["Totals Author"]}
+        for i in range(3)
+    ])
+    resp = await client_fixture.get("/books/", params={"title": "Totals", "limit": 1})
+    assert "X-Total-Count" not in resp.headers
+
+    resp = await client_fixture.get("/books/", params={"title": "Totals", "limit": 1, "include_total": "exact"})
+    assert len(resp.json()) == 1
+    assert resp.headers["X-Total-Count"] == "3"
+    assert resp.headers["X-Total-Count-Strategy"] == "exact"
+
+    resp = await client_fixture.get("/books/", params={"title": "Totals", "include_total": "cached"})
+    resp = await client_fixture.get("/books/", params={"title": "Totals", "skip": 1, "include_total": "cached"})
+    assert (resp.headers["X-Total-Count"], resp.headers["X-Total-Count-Strategy"]) == ("3", "cached")
+
+    resp = await client_fixture.get("/books/", params={"include_total": "approximate"})
+    assert resp.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_only_writes_pin_reads_to_the_primary(client_fixture, monkeypatch):
+    from app import db
+    monkeypatch.setattr(db, "replica_monitors", [db.pool_monitor])
+    resp = await client_fixture.post("/auth/register", json={
+        "username": "pinned", "password": "secret123", "email": "pinned@example.com"
+    })
+    headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+    resp = await client_fixture.post("/auth/login", data={"username": "pinned", "password": "secret123"})
+    assert db.READ_YOUR_WRITES_COOKIE not in resp.headers.get("set-cookie", "")
+
+    resp = await client_fixture.post("/books/", json={
+        "title": "Pinned Book", "genre": "Fiction", "published_year": 2020, "authors": ["Pin"]
+    }, headers=headers)
+    assert resp.status_code == 201
+    assert db.READ_YOUR_WRITES_COOKIE in resp.headers["set-cookie"]
+
+    resp = await client_fixture.post("/books/batch-get", json={"ids": [resp.json()["id"]]})
+    assert resp.status_code == 200
+    assert "set-cookie" not in resp.headers
+
+    # a failed write does not pin the client either
+    resp = await client_fixture.delete("/books/999999", headers=headers)
+    assert resp.status_code == 404
+    assert "set-cookie" not in resp.headers
@@ -0,0 +1,87 @@
+import json
+import pytest
+
+
+async def _auth_headers(client, username):
+    resp = await client.post("/auth/register", json={
+        "username": username,
+        "password": "secret123",
+        "email": f"{username}@test.com"
+    })
+    assert resp.status_code == 201
+    return {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+
+@pytest.mark.asyncio
+async def test_stream_import_csv(client_fixture):
+    headers = await _auth_headers(client_fixture, "csv_importer")
+    content = (
+        "title,genre,published_year,authors\r\n"
+        "Stream One,Fiction,2001,Ann;Bob\r\n"
+        "\"Multi\nline, title\",Science,2002,Ann\r\n"
+        ",History,2003,Nobody\r\n"
+        "Stream Three,History,2004,Cid\r\n"
+    )
+    resp = await client_fixture.post(
+        "/books/import?stream=true&batch_size=2&commit_per_batch=true",
+        files={"file": ("books.csv", content.encode("utf-8"), "text/csv")},
+        headers=headers,
+    )
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["imported"] == 3
+    assert body["rejected"] == 1
+    assert body["errors"][0]["row"] == 3
+    assert body["errors"][0]["error"] == "Invalid title"
+
+
+@pytest.mark.asyncio
+async def test_stream_import_json(client_fixture, monkeypatch):
+    from app.config import settings
+    monkeypatch.setattr(settings, "import_chunk_size", 7)
+    headers = await _auth_headers(client_fixture, "json_importer")
+    books = [
+        {"title": f"Json Stream {i}", "genre": "Fiction", "published_year": 1990 + i, "authors": ["Jo"]}
+        for i in range(5)
+    ]
+    resp = await client_fixture.post(
+        "/books/import?stream=true&batch_size=2",
+        files={"file": ("books.json", json.dumps(books).encode("utf-8"), "application/json")},
+        headers=headers,
+    )
+    assert resp.status_code == 200
+    assert resp.json() == {"imported": 5, "rejected": 0, "errors": []}
+
+    resp = await client_fixture.post(
+        "/books/import?stream=true",
+        files={"file": ("books.json", b'{"title": "not an array"}', "application/json")},
+        headers=headers,
+    )
+    assert resp.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_stream_import_rejects_incomplete_rows(client_fixture):
+    headers = await _auth_headers(client_fixture, "partial_importer")
+    books = [
+        {"title": "Partial One", "genre": "Fiction", "published_year": 2001, "authors": ["Pat"]},
+        {"title": "Partial No Year", "genre": "Fiction", "authors": ["Pat"]},
+        {"title": "Partial Bad Genre", "genre": "Poetry", "published_year": 2002, "authors": ["Pat"]},
+        {"title": "Partial Two", "genre": "History", "published_year": 2003, "authors": ["Pat"]},
+    ]
+    resp = await client_fixture.post(
+        "/books/import?stream=true&batch_size=2&commit_per_batch=true",
+        files={"file": ("books.json", json.dumps(books).encode("utf-8"), "application/json")},
+        headers=headers,
+    )
+    assert resp.status_code == 200
+    body = resp.json()
+    assert (body["imported"], body["rejected"]) == (2, 2)
+    assert [e["error"] for e in body["errors"]] == ["Missing published_year", "Invalid genre: Poetry"]
+
+    resp = await client_fixture.post(
+        "/books/import?stream=true&batch_size=10000",
+        files={"file": ("books.json", json.dumps(books[:1]).encode("utf-8"), "application/json")},
+        headers=headers,
+    )
+    assert resp.status_code == 422
@@ -0,0 +1,42 @@
+import pytest
+from app import metrics
+
+
+@pytest.mark.asyncio
+async def test_metrics_report_routes_and_sql(client_fixture, db_conn):
+    from app.services import book_service
+    book = await book_service.create_book(db_conn, "Metered", "Science", 2012, ["Metered Author"])
+    await book_service.invalidate_books([book["id"]])
+    labels = ("GET", "/books/{book_id}")
+    before = metrics.request_statements.count(labels)
+
+    resp = await client_fixture.get(f"/books/{book['id']}")
+    assert resp.status_code == 200
+    assert metrics.request_statements.count(labels) == before + 1
+    assert metrics.request_statements._values[labels][1] >= 1
+
+    resp = await client_fixture.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    body = resp.text
+    assert 'bms_http_requests_total{method="GET",route="/books/{book_id}",status="200"}' in body
+    assert 'bms_http_request_duration_seconds_bucket{method="GET",route="/books/{book_id}",le="+Inf"}' in body
+    assert "# TYPE bms_db_statements_per_request histogram" in body
+    assert 'bms_db_pool_checkouts{engine="primary"}' in body
+
+
+@pytest.mark.asyncio
+async def test_pool_stats(client_fixture):
+    resp = await client_fixture.get("/system/pool")
+    assert resp.status_code == 401
+    resp = await client_fixture.post("/auth/register", json={
+        "username": "operator", "password": "secret123", "email": "operator@example.com"
+    })
+    headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+    resp = await client_fixture.get("/system/pool", headers=headers)
+    assert resp.status_code == 200
+    assert resp.json()["replicas"] == []
+    assert "checkouts" in resp.json()["primary"]
+    assert "url" not in resp.json()["primary"]
+    assert (await client_fixture.get("/system/cache")).status_code == 401
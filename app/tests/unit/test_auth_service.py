@@ -1,3 +1,4 @@
+import asyncio
 import pytest
 from app.services import auth_service
 
@@ -14,3 +15,64 @@ def test_create_and_decode_token():
     decoded = auth_service.decode_token(token)
     assert decoded["sub"] == "testuser"
     assert "exp" in decoded
+
+
+@pytest.mark.asyncio
+async def test_principal_cache_respects_invalidation_and_expiry():
+    from app.cache import cache
+    user = {"id": 1, "username": "cached_user", "email": "c@test.com"}
+    token = auth_service.create_access_token({"sub": "cached_user"}, expires_seconds=60)
+    claims = auth_service.decode_token(token)
+    auth_service.cache_principal(token, claims, user, await auth_service.principal_generation("cached_user"))
+    assert (await auth_service.get_cached_principal(token))["user"] == user
+    assert auth_service.cached_username(token) == "cached_user"
+
+    # another worker invalidates through the shared backend; this process's entry is ignored from then on
+    await cache.backend.incr("gen:user:cached_user")
+    assert await auth_service.get_cached_principal(token) is None
+
+    # an entry built from a user loaded before an invalidation is outdated as soon as it is cached
+    generation = await auth_service.principal_generation("cached_user")
+    await auth_service.invalidate_principal("cached_user")
+    auth_service.cache_principal(token, claims, user, generation)
+    assert await auth_service.get_cached_principal(token) is None
+
+    expired = {"sub": "cached_user", "exp": claims["exp"] - 3600}
+    auth_service.cache_principal("expired-token", expired, user, generation)
+    assert await auth_service.get_cached_principal("expired-token") is None
+
+
+@pytest.mark.asyncio
+async def test_create_user_invalidates_cached_principals(db_conn):
+    before = await auth_service.principal_generation("reused_name")
+    await auth_service.create_user(db_conn, "reused_name", "secret123", "r@test.com")
+    assert await auth_service.principal_generation("reused_name") == before + 1
+
+
+@pytest.mark.asyncio
+async def test_password_hashing_runs_off_the_event_loop():
+    import threading
+    from app.errors import AppError
+    from app.hashing import PasswordHasher
+
+    hasher = PasswordHasher(workers=1, max_pending=1)
+    loop_thread = threading.get_ident()
+    assert await hasher.run(threading.get_ident) != loop_thread
+
+    release = threading.Event()
+    blocked = asyncio.ensure_future(hasher.run(release.wait))
+    await asyncio.sleep(0)
+    with pytest.raises(AppError) as exc:
+        await hasher.run(threading.get_ident)
+    assert exc.value.status_code == 503
+    release.set()
+    await blocked
+
+    stats = hasher.stats()
+    assert stats["completed"] == 2
+    assert stats["rejected"] == 1
+    assert stats["queued"] == 0
+    hasher.shutdown()
+
+    hashed = await auth_service.hash_password_async("secret123")
+    assert await auth_service.verify_password_async("secret123", hashed)
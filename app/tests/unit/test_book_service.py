@@ -1,5 +1,7 @@
+import json
 import pytest
 from app.services import book_service
+from app.errors import AppError
 
 @pytest.mark.asyncio
 async def test_create_book(db_conn):
@@ -26,3 +28,438 @@ async def test_bulk_create_and_query(db_conn):
     books = await book_service.get_books(db_conn, limit=50)
     assert any(b["title"] == "Bulk A" for b in books)
     assert any(b["title"] == "Bulk B" for b in books)
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_in_batches_shares_authors(db_conn):
+    data = [
+        {"title": f"Batch {i}", "genre": "Fiction", "published_year": 2000 + i, "authors": ["Shared Author", f"Solo {i}"]}
+        for i in range(5)
+    ]
+    created = await book_service.bulk_create_books(db_conn, data, batch_size=2)
+    assert [b["title"] for b in created] == [f"Batch {i}" for i in range(5)]
+    shared_ids = {a["id"] for b in created for a in b["authors"] if a["name"] == "Shared Author"}
+    assert len(shared_ids) == 1
+    for b in created:
+        book = await book_service.get_book_by_id(db_conn, b["id"])
+        assert book["published_year"] == b["published_year"]
+        assert sorted(a["name"] for a in book["authors"]) == sorted(a["name"] for a in b["authors"])
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_reports_invalid_row(db_conn):
+    data = [
+        {"title": "Fine", "genre": "Fiction", "published_year": 2001, "authors": ["X"]},
+        {"title": "Broken", "genre": "Fiction", "published_year": "soon", "authors": ["X"]},
+    ]
+    with pytest.raises(AppError) as exc:
+        await book_service.bulk_create_books(db_conn, data, batch_size=1)
+    assert exc.value.message == "Invalid published_year: soon"
+    assert exc.value.details == {"book": data[1]}
+
+
+@pytest.mark.asyncio
+async def test_cursor_pages_match_offset_order(db_conn):
+    await book_service.bulk_create_books(db_conn, [
+        {"title": "Same Title", "genre": "Science", "published_year": 1980 + i % 3, "authors": ["Pager"]}
+        for i in range(7)
+    ])
+    for sort_by, order in [("title", "asc"), ("published_year", "desc")]:
+        expected = await book_service.get_books(db_conn, sort_by=sort_by, order=order, limit=1000)
+        seen = []
+        after = None
+        while True:
+            page = await book_service.get_books(db_conn, sort_by=sort_by, order=order, limit=3, after=after)
+            seen.extend(b["id"] for b in page)
+            if len(page) < 3:
+                break
+            cursor = book_service.encode_cursor(page[-1], sort_by, order)
+            after = book_service.decode_cursor(cursor, sort_by, order)
+        assert seen == [b["id"] for b in expected]
+
+
+def test_decode_cursor_rejects_other_sort():
+    cursor = book_service.encode_cursor({"id": 1, "title": "A"}, "title", "asc")
+    with pytest.raises(AppError):
+        book_service.decode_cursor(cursor, "title", "desc")
+    with pytest.raises(AppError):
+        book_service.decode_cursor("not-a-cursor", "title", "asc")
+
+
+@pytest.mark.asyncio
+async def test_get_books_filters_with_aggregated_authors(db_conn):
+    await book_service.bulk_create_books(db_conn, [
+        {"title": "Filter Target", "genre": "History", "published_year": 1901, "authors": ["Zed Filter", "Amy Filter"]},
+        {"title": "Filter Other", "genre": "History", "published_year": 1902, "authors": ["Nobody Else"]},
+    ])
+    books = await book_service.get_books(db_conn, author="zed filter", limit=50)
+    assert [b["title"] for b in books] == ["Filter Target"]
+    assert sorted(a["name"] for a in books[0]["authors"]) == ["Amy Filter", "Zed Filter"]
+
+    books = await book_service.get_books(db_conn, title="filter", year_from=1902, limit=50)
+    assert [b["title"] for b in books] == ["Filter Other"]
+    assert books[0]["authors"][0]["name"] == "Nobody Else"
+
+
+@pytest.mark.asyncio
+async def test_search_ranks_titles_and_authors(db_conn):
+    await book_service.bulk_create_books(db_conn, [
+        {"title": "Quantum Gardens", "genre": "Science", "published_year": 2010, "authors": ["Mira Holt"]},
+        {"title": "Gardening Basics", "genre": "Science", "published_year": 2011, "authors": ["Quentin Quantum"]},
+        {"title": "Unrelated", "genre": "Science", "published_year": 2012, "authors": ["Somebody"]},
+    ])
+    books = await book_service.get_books(db_conn, q="quantum garden", sort_by="relevance", limit=50)
+    assert {b["title"] for b in books} == {"Quantum Gardens", "Gardening Basics"}
+
+    books = await book_service.get_books(db_conn, q="holt", limit=50)
+    assert [b["title"] for b in books] == ["Quantum Gardens"]
+
+    created = await book_service.create_book(db_conn, "Fresh Title", "Fiction", 2015, ["Searchable Writer"])
+    books = await book_service.get_books(db_conn, q="searchable", limit=50)
+    assert [b["id"] for b in books] == [created["id"]]
+
+
+def test_postgres_search_unions_indexed_matches():
+    from types import SimpleNamespace
+    conn = SimpleNamespace(dialect=SimpleNamespace(name="postgresql"))
+    params: dict = {}
+    join, where, rank = book_service._search_sql(conn, "Quantum garden", params)
+    assert join == ""
+    # each branch must be answerable from its own index, which an OR across them prevents
+    assert " OR " not in where
+    assert where.count("UNION") == 2
+    assert params == {"tsq": "quantum:* & garden:*", "q": "quantum garden"}
+
+
+@pytest.mark.asyncio
+async def test_reads_are_cached_and_invalidated_by_writes(db_conn):
+    from app.cache import cache
+    book = await book_service.create_book(db_conn, "Cached Book", "Fiction", 2001, ["Cache Author"])
+    await book_service.get_book_by_id(db_conn, book["id"])
+    hits = cache.hits
+    assert (await book_service.get_book_by_id(db_conn, book["id"]))["title"] == "Cached Book"
+    assert cache.hits == hits + 1
+
+    await book_service.get_books(db_conn, title="Cached", limit=50)
+    await book_service.update_book(db_conn, book["id"], {"title": "Cached Book v2"})
+    assert (await book_service.get_book_by_id(db_conn, book["id"]))["title"] == "Cached Book v2"
+    listed = await book_service.get_books(db_conn, title="Cached", limit=50)
+    assert [b["title"] for b in listed] == ["Cached Book v2"]
+
+    await book_service.delete_book(db_conn, book["id"])
+    assert await book_service.get_book_by_id(db_conn, book["id"]) is None
+    assert await book_service.get_books(db_conn, title="Cached", limit=50) == []
+
+
+@pytest.mark.asyncio
+async def test_book_read_racing_an_update_cannot_cache_the_old_row(db_conn):
+    from app.cache import cache
+    book = await book_service.create_book(db_conn, "Racing Book", "Fiction", 2001, ["Race Author"])
+    # a reader looked the row up just before the update committed, and stores it only afterwards
+    stale_key = await book_service._book_cache_key(book["id"])
+    stale = await book_service.get_book_by_id(db_conn, book["id"])
+    await book_service.update_book(db_conn, book["id"], {"title": "Racing Book v2"})
+    await cache.set(stale_key, stale)
+    assert (await book_service.get_book_by_id(db_conn, book["id"]))["title"] == "Racing Book v2"
+
+    # a write to another book leaves this one cached
+    other = await book_service.create_book(db_conn, "Bystander", "Fiction", 2002, ["Race Author"])
+    await book_service.update_book(db_conn, other["id"], {"title": "Bystander v2"})
+    hits = cache.hits
+    await book_service.get_book_by_id(db_conn, book["id"])
+    assert cache.hits == hits + 1
+
+
+@pytest.mark.asyncio
+async def test_resolve_author_ids_caches_committed_authors(db_conn):
+    from sqlalchemy import event
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    resolved = await book_service.resolve_author_ids(db_conn, ["Resolver One", "Resolver Two", "Resolver One"])
+    assert set(resolved) == {"Resolver One", "Resolver Two"}
+    await book_service.commit_changes(db_conn)
+
+    event.listen(db_conn.sync_engine, "before_cursor_execute", count)
+    try:
+        again = await book_service.resolve_author_ids(db_conn, ["Resolver Two", "Resolver One"])
+    finally:
+        event.remove(db_conn.sync_engine, "before_cursor_execute", count)
+    assert again == resolved
+    assert statements == []
+
+
+@pytest.mark.asyncio
+async def test_rolled_back_authors_are_not_cached(db_conn):
+    resolved = await book_service.resolve_author_ids(db_conn, ["Ghost Author"])
+    await book_service.rollback_changes(db_conn)
+    assert book_service._author_ids.get("Ghost Author") is None
+    again = await book_service.resolve_author_ids(db_conn, ["Ghost Author"])
+    await book_service.commit_changes(db_conn)
+    assert book_service._author_ids.get("Ghost Author") == again["Ghost Author"]
+    assert "Ghost Author" in resolved
+
+
+@pytest.mark.asyncio
+async def test_update_book_diffs_authors(db_conn):
+    book = await book_service.create_book(
+        db_conn, title="Diff Me", genre="Fiction", published_year=2010, authors=["Keep Author", "Drop Author"]
+    )
+    kept_id = next(a["id"] for a in book["authors"] if a["name"] == "Keep Author")
+
+    updated = await book_service.update_book(
+        db_conn, book["id"], {"published_year": 2011, "authors": ["Keep Author", "New Author"]}
+    )
+    assert updated["title"] == "Diff Me"
+    assert updated["published_year"] == 2011
+    assert updated["version"] == book["version"] + 1
+    assert {a["name"] for a in updated["authors"]} == {"Keep Author", "New Author"}
+    assert next(a["id"] for a in updated["authors"] if a["name"] == "Keep Author") == kept_id
+
+    await book_service.invalidate_books([book["id"]])
+    assert await book_service.get_book_by_id(db_conn, book["id"]) == updated
+    assert await book_service.update_book(db_conn, 999999, {"title": "Missing"}) is None
+
+
+@pytest.mark.asyncio
+async def test_delete_books_cascades_author_links(db_conn):
+    from sqlalchemy import text
+
+    created = await book_service.bulk_create_books(db_conn, [
+        {"title": f"Doomed {i}", "genre": "History", "published_year": 1990, "authors": ["Doomed Author"]}
+        for i in range(3)
+    ])
+    ids = [b["id"] for b in created]
+    result = await book_service.delete_books(db_conn, ids[:2] + [999999])
+    assert result == {"deleted": ids[:2], "not_found": [999999]}
+
+    r = await db_conn.execute(text("SELECT book_id FROM book_authors WHERE book_id IN (:a, :b, :c)"),
+                              {"a": ids[0], "b": ids[1], "c": ids[2]})
+    assert [row[0] for row in r.fetchall()] == [ids[2]]
+    assert await book_service.delete_book(db_conn, ids[2])
+    assert not await book_service.delete_book(db_conn, ids[2])
+
+
+@pytest.mark.asyncio
+async def test_update_books_reports_per_item_status(db_conn):
+    created = await book_service.bulk_create_books(db_conn, [
+        {"title": f"Patch {i}", "genre": "Science", "published_year": 2000, "authors": ["Patch Author"]}
+        for i in range(2)
+    ])
+    a, b = (book["id"] for book in created)
+    results = await book_service.update_books(db_conn, [
+        {"id": a, "title": "Patched A", "authors": ["Patch Author", "Second Patch Author"]},
+        {"id": b, "published_year": 2005},
+        {"id": 999999, "title": "Nobody"},
+        {"id": a, "title": "Again"},
+        {"id": 999998, "title": "   "},
+    ])
+    assert [(r["id"], r["status"]) for r in results] == [
+        (a, "updated"), (b, "updated"), (999999, "not_found"), (a, "invalid"), (999998, "invalid")
+    ]
+    assert results[0]["book"]["title"] == "Patched A"
+    assert [x["name"] for x in results[0]["book"]["authors"]] == ["Patch Author", "Second Patch Author"]
+    assert results[1]["book"]["title"] == "Patch 1"
+    assert results[1]["book"]["published_year"] == 2005
+
+    fetched = await book_service.get_books_by_ids(db_conn, [b, 999999, a])
+    assert [book["id"] for book in fetched] == [b, a]
+    assert fetched[1] == results[0]["book"]
+
+
+@pytest.mark.asyncio
+async def test_update_books_rejects_items_without_fields(db_conn):
+    book = await book_service.create_book(db_conn, "Untouched", "Science", 2000, ["Still Author"])
+    results = await book_service.update_books(db_conn, [{"id": book["id"]}, {"id": 999999, "title": None}])
+    assert [(r["status"], r["error"]) for r in results] == [
+        ("invalid", "No fields provided for update"), ("invalid", "No fields provided for update")
+    ]
+    fetched = await book_service.get_books_by_ids(db_conn, [book["id"]])
+    assert fetched[0]["version"] == book["version"]
+    assert fetched[0]["updated_at"] == book["updated_at"]
+
+
+@pytest.mark.asyncio
+async def test_authors_json_is_kept_in_sync(db_conn):
+    from sqlalchemy import text
+    book = await book_service.create_book(db_conn, "Denormalized", "Science", 2011, ["Copy Beta", "Copy Alpha"])
+    stored = await db_conn.execute(text("SELECT authors_json FROM books WHERE id = :id"), {"id": book["id"]})
+    # authors are listed by id, and new authors get their ids in name order
+    assert [a["name"] for a in json.loads(stored.scalar())] == ["Copy Alpha", "Copy Beta"]
+
+    await book_service.update_book(db_conn, book["id"], {"authors": ["Copy Alpha", "Copy Gamma"]})
+    fetched = await book_service.get_book_by_id(db_conn, book["id"])
+    assert [a["name"] for a in fetched["authors"]] == ["Copy Alpha", "Copy Gamma"]
+
+    # reads come from the column alone, the link table is only consulted for rows without a copy
+    await db_conn.execute(text("DELETE FROM book_authors WHERE book_id = :id"), {"id": book["id"]})
+    await db_conn.commit()
+    await book_service.invalidate_books([book["id"]])
+    assert len((await book_service.get_book_by_id(db_conn, book["id"]))["authors"]) == 2
+
+    await db_conn.execute(text("UPDATE books SET authors_json = NULL WHERE id = :id"), {"id": book["id"]})
+    await db_conn.commit()
+    await book_service.invalidate_books([book["id"]])
+    assert (await book_service.get_book_by_id(db_conn, book["id"]))["authors"] == []
+    await book_service.delete_book(db_conn, book["id"])
+
+
+@pytest.mark.asyncio
+async def test_check_and_backfill_authors_json(db_conn):
+    from sqlalchemy import text
+    created = await book_service.bulk_create_books(db_conn, [
+        {"title": f"Checked {i}", "genre": "History", "published_year": 1990, "authors": [f"Checker {i}"]}
+        for i in range(3)
+    ])
+    ids = [b["id"] for b in created]
+    await db_conn.execute(text("UPDATE books SET authors_json = NULL WHERE id = :id"), {"id": ids[0]})
+    await db_conn.execute(text("UPDATE books SET authors_json = '[]' WHERE id = :id"), {"id": ids[1]})
+    await db_conn.commit()
+
+    report = await book_service.check_authors_json(db_conn, batch_size=2)
+    assert report["missing"] == 1 and report["mismatched"] == 1
+    assert set(report["sample"]) == {ids[0], ids[1]}
+
+    assert await book_service.backfill_authors_json(db_conn, batch_size=2) == 1
+    report = await book_service.check_authors_json(db_conn, repair=True)
+    assert (report["missing"], report["mismatched"], report["repaired"]) == (0, 1, 1)
+    assert (await book_service.check_authors_json(db_conn))["mismatched"] == 0
+    fetched = await book_service.get_book_by_id(db_conn, ids[1])
+    assert [a["name"] for a in fetched["authors"]] == ["Checker 1"]
+
+
+@pytest.mark.asyncio
+async def test_rename_author_rewrites_books(db_conn):
+    book = await book_service.create_book(db_conn, "Renamed", "Fiction", 2015, ["Old Pen Name", "Co Writer"])
+    old_id = next(a["id"] for a in book["authors"] if a["name"] == "Old Pen Name")
+    await book_service.get_book_by_id(db_conn, book["id"])
+
+    renamed = await book_service.rename_author(db_conn, old_id, "New Pen Name")
+    assert renamed == {"id": old_id, "name": "New Pen Name", "books": 1}
+    fetched = await book_service.get_book_by_id(db_conn, book["id"])
+    assert {"id": old_id, "name": "New Pen Name"} in fetched["authors"]
+    assert fetched["version"] == book["version"] + 1
+    assert [b["id"] for b in await book_service.get_books(db_conn, q="new pen")] == [book["id"]]
+
+    # the old name is free again and must not resolve to the renamed author
+    ids = await book_service.resolve_author_ids(db_conn, ["Old Pen Name", "New Pen Name"])
+    await book_service.commit_changes(db_conn)
+    assert ids["New Pen Name"] == old_id and ids["Old Pen Name"] != old_id
+
+    with pytest.raises(AppError) as exc:
+        await book_service.rename_author(db_conn, old_id, "Co Writer")
+    assert exc.value.status_code == 409
+    assert await book_service.rename_author(db_conn, 999999, "Nobody") is None
+
+
+@pytest.mark.asyncio
+async def test_facet_counters_follow_writes(db_conn):
+    from sqlalchemy import text
+    await book_service.recompute_facets(db_conn)
+    before = await book_service.get_book_stats(db_conn, top_authors=100)
+
+    book = await book_service.create_book(db_conn, "Faceted", "Science", 1987, ["Facet Writer", "Facet Editor"])
+    created = await book_service.bulk_create_books(db_conn, [
+        {"title": f"Faceted {i}", "genre": "History", "published_year": 1961 + i, "authors": ["Facet Writer"]}
+        for i in range(3)
+    ])
+    await book_service.update_book(db_conn, book["id"], {"genre": "History", "authors": ["Facet Writer"]})
+    await book_service.update_book(db_conn, created[0]["id"], {"title": "Faceted renamed"})
+    await book_service.update_books(db_conn, [{"id": created[1]["id"], "published_year": 2003}])
+    await book_service.delete_book(db_conn, created[2]["id"])
+
+    counted = await book_service.get_book_stats(db_conn, top_authors=100)
+    exact = await book_service.get_book_stats(db_conn, top_authors=100, exact=True)
+    assert counted["source"] == "counters" and exact["source"] == "exact"
+    assert {k: v for k, v in counted.items() if k != "source"} == {k: v for k, v in exact.items() if k != "source"}
+    assert counted["total"] == before["total"] + 3
+    writer = next(a for a in counted["authors"] if a["name"] == "Facet Writer")
+    assert writer["count"] == 3
+    assert all(a["name"] != "Facet Editor" for a in counted["authors"])
+
+    await db_conn.execute(text("UPDATE book_facets SET count = count + 5 WHERE facet = 'genre' AND value = 'History'"))
+    await db_conn.commit()
+    assert (await book_service.recompute_facets(db_conn))["drifted"] == 1
+    assert (await book_service.get_book_stats(db_conn, top_authors=100))["genres"] == exact["genres"]
+
+
+@pytest.mark.asyncio
+async def test_interleaved_updates_keep_facet_counters_exact(tmp_path, monkeypatch):
+    import asyncio
+    from sqlalchemy import text
+    from app import models
+    from app.db import build_engine
+    engine = build_engine(f"sqlite+aiosqlite:///{tmp_path}/facets.db")
+    async with engine.begin() as conn:
+        await conn.run_sync(models.Base.metadata.create_all)
+    async with engine.connect() as conn:
+        book = await book_service.create_book(conn, "Contended", "Fiction", 1950, ["Race Writer"])
+
+    # hold the first update open after its facet changes, until the second one has started
+    touch_catalog = book_service._touch_catalog
+    paused, release = asyncio.Event(), asyncio.Event()
+
+    async def paused_touch(conn):
+        if not paused.is_set():
+            paused.set()
+            await release.wait()
+        await touch_catalog(conn)
+
+    monkeypatch.setattr(book_service, "_touch_catalog", paused_touch)
+
+    async def update(data):
+        async with engine.connect() as conn:
+            return await book_service.update_book(conn, book["id"], data)
+
+    first = asyncio.create_task(update({"genre": "History"}))
+    await paused.wait()
+    second = asyncio.create_task(update({"genre": "Science", "published_year": 1999, "authors": ["Other Writer"]}))
+    await asyncio.sleep(0.1)
+    release.set()
+    await asyncio.gather(first, second)
+
+    async with engine.connect() as conn:
+        genre = await conn.execute(text("SELECT genre FROM books WHERE id = :id"), {"id": book["id"]})
+        assert genre.scalar() == "Science"
+        assert (await book_service.recompute_facets(conn))["drifted"] == 0
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_filtered_stats_are_grouped_and_cached(db_conn):
+    from app.cache import cache
+    await book_service.bulk_create_books(db_conn, [
+        {"title": "Stats Orbit", "genre": "Science", "published_year": 1972, "authors": ["Orbit Author"]},
+        {"title": "Stats Orbit II", "genre": "Fiction", "published_year": 1979, "authors": ["Orbit Author", "Co Orbit"]},
+    ])
+    stats = await book_service.get_book_stats(db_conn, title="Stats Orbit")
+    assert stats["source"] == "exact" and stats["total"] == 2
+    assert stats["decades"] == [{"decade": 1970, "count": 2}]
+    assert {g["genre"] for g in stats["genres"]} == {"Science", "Fiction"}
+    assert stats["authors"][0]["name"] == "Orbit Author" and stats["authors"][0]["count"] == 2
+
+    hits = cache.hits
+    assert await book_service.get_book_stats(db_conn, title="Stats Orbit") == stats
+    assert cache.hits == hits + 1
+    science = await book_service.get_book_stats(db_conn, title="Stats Orbit", genre="Science")
+    assert science["total"] == 1
+
+
+@pytest.mark.asyncio
+async def test_count_books_strategies(db_conn):
+    await book_service.bulk_create_books(db_conn, [
+        {"title": f"Counted Harbor {i}", "genre": "Science", "published_year": 1990 + i, "authors": ["Count Author"]}
+        for i in range(4)
+    ])
+    assert await book_service.count_books(db_conn, "exact", title="Counted Harbor") == (4, "exact")
+    assert await book_service.count_books(db_conn, "exact", title="Counted Harbor", year_from=1992) == (2, "exact")
+    # SQLite has no planner estimates to read
+    assert await book_service.count_books(db_conn, "estimated", q="counted harbor") == (4, "exact")
+
+    assert await book_service.count_books(db_conn, "cached", q="Counted, HARBOR") == (4, "exact")
+    assert await book_service.count_books(db_conn, "cached", q="counted harbor") == (4, "cached")
+
+    await book_service.create_book(db_conn, "Counted Harbor 9", "Science", 2000, ["Count Author"])
+    assert await book_service.count_books(db_conn, "cached", q="counted harbor") == (5, "exact")
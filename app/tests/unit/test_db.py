@@ -0,0 +1,73 @@
+import pytest
+from sqlalchemy import text
+from app.config import settings
+from app.db import engine_options, build_engine, PoolMonitor
+
+
+def test_engine_options_for_asyncpg(monkeypatch):
+    monkeypatch.setattr(settings, "db_statement_timeout_ms", 5000)
+    url, options = engine_options("postgresql+asyncpg://user:pw@localhost/books")
+    assert url.query["prepared_statement_cache_size"] == str(settings.db_prepared_statement_cache_size)
+    assert options["connect_args"] == {"server_settings": {"statement_timeout": "5000"}}
+    assert options["pool_size"] == settings.db_pool_size
+    assert options["pool_pre_ping"] is settings.db_pool_pre_ping
+
+    _, options = engine_options("sqlite+aiosqlite:///:memory:")
+    assert "pool_size" not in options
+
+
+@pytest.mark.asyncio
+async def test_pool_monitor_records_checkouts(tmp_path):
+    engine = build_engine(f"sqlite+aiosqlite:///{tmp_path}/pool.db")
+    monitor = PoolMonitor(engine)
+    async with monitor.connect() as conn:
+        assert (await conn.execute(text("SELECT 1"))).scalar() == 1
+        assert monitor.stats()["checked_out"] == 1
+    stats = monitor.stats()
+    assert stats["checked_out"] == 0
+    assert stats["checkouts"] == 1
+    assert stats["size"] == settings.db_pool_size
+    await engine.dispose()
+
+
+async def _read_marker(request) -> tuple[str, bool]:
+    from app.cache import bypass_reads
+    from app.db import get_read_conn
+    deps = get_read_conn(request)
+    conn = await anext(deps)
+    try:
+        return (await conn.execute(text("SELECT name FROM marker"))).scalar(), bypass_reads.get()
+    finally:
+        await deps.aclose()
+
+
+@pytest.mark.asyncio
+async def test_reads_go_to_replica_except_after_a_write(tmp_path, monkeypatch):
+    import time
+    from fastapi import Request, Response
+    from app import db
+
+    monitors = {}
+    for name in ("primary", "replica"):
+        engine = build_engine(f"sqlite+aiosqlite:///{tmp_path}/{name}.db")
+        async with engine.begin() as conn:
+            await conn.execute(text("CREATE TABLE marker (name TEXT)"))
+            await conn.execute(text("INSERT INTO marker VALUES (:n)"), {"n": name})
+        monitors[name] = PoolMonitor(engine)
+    monkeypatch.setattr(db, "pool_monitor", monitors["primary"])
+    monkeypatch.setattr(db, "replica_monitors", [monitors["replica"]])
+
+    def request(cookie: str | None = None) -> Request:
+        headers = [(b"cookie", f"{db.READ_YOUR_WRITES_COOKIE}={cookie}".encode())] if cookie else []
+        return Request({"type": "http", "method": "GET", "path": "/books/", "headers": headers})
+
+    assert await _read_marker(request()) == ("replica", False)
+
+    response = Response()
+    db.mark_recent_write(response)
+    until = response.headers["set-cookie"].split(";")[0].split("=")[1]
+    assert await _read_marker(request(until)) == ("primary", True)
+    assert await _read_marker(request(str(int(time.time()) - 1))) == ("replica", False)
+
+    for monitor in monitors.values():
+        await monitor.engine.dispose()
@@ -0,0 +1,92 @@
+import pytest
+from starlette.requests import Request
+from app.config import settings
+from app.limiter import (
+    MemoryRateLimitStore, SQLiteRateLimitStore, RateLimiter, client_key, parse_rate, parse_rate_overrides
+)
+from app.services.auth_service import create_access_token
+
+
+def make_request(headers: dict | None = None, host: str = "10.0.0.1") -> Request:
+    raw = [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw, "client": (host, 1234)})
+
+
+def test_parse_rate():
+    limit = parse_rate("20/minute")
+    assert (limit.count, limit.period, limit.burst) == (20, 60, 20)
+    assert parse_rate("100/hours burst=10").burst == 10
+    assert str(parse_rate("5/second burst=2")) == "5/second burst=2"
+    assert parse_rate_overrides("list_books=100/minute, export=2/second")["export"].rate == 2
+    with pytest.raises(ValueError):
+        parse_rate("lots")
+
+
+@pytest.mark.asyncio
+async def test_memory_bucket_spends_burst_then_refills(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.limiter.time.monotonic", lambda: now[0])
+    store = MemoryRateLimitStore(100)
+
+    results = [await store.take("k", rate=1.0, capacity=3) for _ in range(4)]
+    assert [allowed for allowed, _ in results] == [True, True, True, False]
+
+    now[0] += 1.5
+    allowed, tokens = await store.take("k", rate=1.0, capacity=3)
+    assert allowed and tokens == pytest.approx(0.5)
+    assert (await store.take("other", rate=1.0, capacity=3))[0]
+
+
+@pytest.mark.asyncio
+async def test_sqlite_buckets_are_shared_between_processes(tmp_path):
+    # two stores on one file stand in for two workers
+    path = str(tmp_path / "limits.db")
+    first, second = SQLiteRateLimitStore(path), SQLiteRateLimitStore(path)
+
+    assert (await first.take("k", rate=0.01, capacity=2))[0]
+    assert (await second.take("k", rate=0.01, capacity=2))[0]
+    allowed, tokens = await first.take("k", rate=0.01, capacity=2)
+    assert not allowed and tokens < 1
+    assert not (await second.take("k", rate=0.01, capacity=2))[0]
+    assert (await second.take("k2", rate=0.01, capacity=2))[0]
+
+
+@pytest.mark.asyncio
+async def test_sqlite_store_prunes_refilled_buckets(tmp_path, monkeypatch):
+    import sqlite3
+    now = [1000.0]
+    monkeypatch.setattr("app.limiter.time.time", lambda: now[0])
+    path = str(tmp_path / "limits.db")
+    store = SQLiteRateLimitStore(path, prune_every=3)
+
+    await store.take("slow", rate=0.001, capacity=2)
+    await store.take("fast", rate=10.0, capacity=2)
+    now[0] += 1
+    # the third decision prunes: "fast" has refilled completely, "slow" has not
+    await store.take("slow", rate=0.001, capacity=2)
+    with sqlite3.connect(path) as conn:
+        assert [row[0] for row in conn.execute("SELECT key FROM rate_limit_buckets")] == ["slow"]
+    assert (await store.take("fast", rate=10.0, capacity=2)) == (True, 1.0)
+
+
+def test_client_key_prefers_user(monkeypatch):
+    token = create_access_token({"sub": "alice"})
+    assert client_key(make_request({"Authorization": f"Bearer {token}"})) == "user:alice"
+    assert client_key(make_request({"Authorization": "Bearer garbage"})) == "ip:10.0.0.1"
+
+    monkeypatch.setattr(settings, "rate_limit_trusted_proxies", 1)
+    request = make_request({"X-Forwarded-For": "1.2.3.4, 5.6.7.8"}, host="10.0.0.2")
+    assert client_key(request) == "ip:5.6.7.8"
+
+
+@pytest.mark.asyncio
+async def test_limiter_decision_headers():
+    limiter = RateLimiter(MemoryRateLimitStore(100))
+    limit = parse_rate("2/minute")
+    first = await limiter.hit("route", "ip:x", limit)
+    assert first.headers() == {"X-RateLimit-Limit": "2", "X-RateLimit-Remaining": "1", "X-RateLimit-Reset": "30"}
+    await limiter.hit("route", "ip:x", limit)
+    rejected = await limiter.hit("route", "ip:x", limit)
+    assert not rejected.allowed
+    assert rejected.headers()["Retry-After"] == "30"
+    assert limiter.stats()["rejected"] == 1
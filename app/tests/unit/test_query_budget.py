@@ -0,0 +1,44 @@
+import logging
+import pytest
+from sqlalchemy import text
+from app.query_budget import fingerprint, QueryBudgetExceeded
+from app.services import book_service
+
+
+def test_fingerprint_normalizes_literals_params_and_lists():
+    assert fingerprint("SELECT *\n  FROM books WHERE id IN (:g0, :g1, :g2) AND title = 'x'") == \
+        "SELECT * FROM books WHERE id IN (...) AND title = ?"
+    assert fingerprint("INSERT INTO t (a, b) VALUES ($1, $2), ($3, $4), ($5, $6)") == \
+        "INSERT INTO t (a, b) VALUES (...), ..."
+    assert fingerprint("SELECT x::text FROM t WHERE y = ? LIMIT 10") == "SELECT x::text FROM t WHERE y = ? LIMIT ?"
+
+
+@pytest.mark.asyncio
+async def test_repeated_statements_are_reported_with_call_site(db_conn, query_budget, caplog):
+    with caplog.at_level(logging.WARNING, logger="app.query_budget"):
+        with pytest.raises(QueryBudgetExceeded) as exc:
+            with query_budget(2, label="per-row loop"):
+                for i in range(3):
+                    await db_conn.execute(text("SELECT :i"), {"i": i})
+    assert "per-row loop ran 3 SQL statements, budget is 2" in str(exc.value)
+    assert "Possible N+1 in per-row loop: 3 x SELECT ?" in caplog.text
+    assert "tests/unit/test_query_budget.py" in caplog.text
+
+
+@pytest.mark.asyncio
+@pytest.mark.query_budget(7)
+async def test_create_book_query_budget(db_conn):
+    await book_service.create_book(db_conn, "Budgeted", "Fiction", 2015, ["Budget One", "Budget Two", "Budget Three"])
+
+
+@pytest.mark.asyncio
+async def test_update_book_authors_query_budget(db_conn, query_budget):
+    book = await book_service.create_book(db_conn, "Budget Update", "Fiction", 2015, ["Kept Author", "Dropped Author"])
+    await book_service.resolve_author_ids(db_conn, ["Added Author"])
+    await book_service.commit_changes(db_conn)
+    # facets out, UPDATE, link delete + insert, facets in, search index (2 on SQLite), catalog state
+    with query_budget(8, label="update_book with authors"):
+        updated = await book_service.update_book(
+            db_conn, book["id"], {"title": "Budget Updated", "authors": ["Kept Author", "Added Author"]}
+        )
+    assert sorted(a["name"] for a in updated["authors"]) == ["Added Author", "Kept Author"]
@@ -0,0 +1,129 @@
+"""Book read latency while a burst of registrations and logins is hashing passwords.
+
+    python -m benchmarks.auth_burst [--users 40] [--inline]
+
+``--inline`` runs bcrypt on the event loop, the way the service did before the
+password hasher pool, to show the difference.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+os.environ.setdefault("JWT_SECRET", "benchmark")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+os.environ.setdefault("JWT_EXPIRATION", "3600")
+
+from httpx import AsyncClient, ASGITransport  # noqa: E402
+from sqlalchemy.ext.asyncio import create_async_engine  # noqa: E402
+from sqlalchemy.pool import NullPool  # noqa: E402
+from app import models  # noqa: E402
+from app.db import get_conn, get_read_conn  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services import auth_service, book_service  # noqa: E402
+
+
+class InlineHasher:
+    async def run(self, fn, *args):
+        return fn(*args)
+
+    def stats(self) -> dict:
+        return {}
+
+
+def summarize(name: str, latencies: list) -> str:
+    ms = sorted(x * 1000 for x in latencies)
+    p95 = ms[int(len(ms) * 0.95) - 1]
+    return (
+        f"{name:>6}: n={len(ms):<5} p50={statistics.median(ms):7.2f}ms "
+        f"p95={p95:7.2f}ms max={ms[-1]:7.2f}ms"
+    )
+
+
+async def read_loop(client: AsyncClient, book_ids: list, stop: asyncio.Event, latencies: list):
+    i = 0
+    while not stop.is_set():
+        started = time.perf_counter()
+        resp = await client.get(f"/books/{book_ids[i % len(book_ids)]}")
+        latencies.append(time.perf_counter() - started)
+        resp.raise_for_status()
+        i += 1
+
+
+async def auth_burst(client: AsyncClient, users: int):
+    async def one(n: int):
+        username = f"bench_{n}_{time.monotonic_ns()}"
+        resp = await client.post("/auth/register", json={
+            "username": username, "password": "secret123", "email": f"{username}@example.com"
+        })
+        resp.raise_for_status()
+        resp = await client.post("/auth/login", data={"username": username, "password": "secret123"})
+        resp.raise_for_status()
+
+    await asyncio.gather(*(one(n) for n in range(users)))
+
+
+async def main(users: int, idle_seconds: float, inline: bool):
+    # a file rather than :memory: so that concurrent requests get their own connections, and no
+    # pool limit so that reads never wait behind auth requests holding a connection while hashing
+    db_dir = tempfile.TemporaryDirectory()
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{db_dir.name}/bench.db", poolclass=NullPool, connect_args={"timeout": 60}
+    )
+
+    async def bench_conn():
+        async with engine.connect() as conn:
+            yield conn
+
+    app.dependency_overrides[get_conn] = bench_conn
+    app.dependency_overrides[get_read_conn] = bench_conn
+    if inline:
+        auth_service.password_hasher = InlineHasher()
+
+    async with engine.begin() as conn:
+        await conn.run_sync(models.Base.metadata.create_all)
+    async with engine.connect() as conn:
+        await book_service.bulk_create_books(conn, [
+            {"title": f"Book {i}", "genre": "Fiction", "published_year": 2000, "authors": [f"Author {i % 10}"]}
+            for i in range(50)
+        ])
+        book_ids = [b["id"] for b in await book_service.get_books(
+            conn, None, None, None, None, None, "title", "asc", 50, 0
+        )]
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        idle: list = []
+        stop = asyncio.Event()
+        reader = asyncio.create_task(read_loop(client, book_ids, stop, idle))
+        await asyncio.sleep(idle_seconds)
+        stop.set()
+        await reader
+
+        burst: list = []
+        stop = asyncio.Event()
+        reader = asyncio.create_task(read_loop(client, book_ids, stop, burst))
+        started = time.perf_counter()
+        await auth_burst(client, users)
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await reader
+
+    print(f"hashing: {'inline on the event loop' if inline else 'password hasher pool'}")
+    print(summarize("idle", idle))
+    print(summarize("burst", burst))
+    print(f"{users} register+login pairs in {elapsed:.2f}s")
+    print(f"hasher: {auth_service.password_hasher.stats()}")
+    await engine.dispose()
+    db_dir.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=40)
+    parser.add_argument("--idle-seconds", type=float, default=1.0)
+    parser.add_argument("--inline", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(main(args.users, args.idle_seconds, args.inline))
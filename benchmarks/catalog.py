@@ -0,0 +1,296 @@
+"""Service-level benchmarks against a seeded synthetic catalog.
+
+    python -m benchmarks.catalog --size 10k [--database-url URL] [--output run.json]
+                                 [--baseline benchmarks/baseline.json] [--fail-on-regression]
+
+The catalog is generated from a fixed seed, so the same size always produces the same rows. SQLite
+catalogs are kept in the temp directory and reused by later runs of the same size; pass
+``--database-url postgresql+asyncpg://...`` to run against a local Postgres instead. The read
+cache is disabled so every call reaches the database.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+os.environ.setdefault("JWT_SECRET", "benchmark")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+os.environ.setdefault("JWT_EXPIRATION", "3600")
+
+import sqlalchemy  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+from app import models  # noqa: E402
+from app.cache import cache, NullCacheBackend  # noqa: E402
+from app.db import build_engine  # noqa: E402
+from app.schemas.book_schema import Genre  # noqa: E402
+from app.services import book_service  # noqa: E402
+
+SEED = 20261017
+SEED_CHUNK = 10000
+FIRST_NAMES = ["Ada", "Boris", "Chiara", "Dmytro", "Elena", "Farid", "Grace", "Hiro", "Ines", "Jonas",
+               "Kateryna", "Liam", "Mei", "Nadia", "Oskar", "Priya", "Quentin", "Rosa", "Stefan", "Tariq"]
+LAST_NAMES = ["Adams", "Bondarenko", "Castillo", "Dubois", "Eriksen", "Fischer", "Garcia", "Horvat", "Ivanova",
+              "Jensen", "Kowalski", "Lopez", "Moreau", "Novak", "Okafor", "Petrov", "Quinn", "Rossi", "Sato", "Tkachenko"]
+TITLE_WORDS = ["river", "empire", "garden", "shadow", "winter", "machine", "atlas", "harbor", "silence", "orbit",
+               "forest", "letters", "kingdom", "signal", "archive", "mirror", "desert", "bridge", "voyage", "ember"]
+TITLE_FORMS = ["The {a} {b}", "{a} of the {b}", "A History of {a}", "{a} and {b}", "Notes on the {a}"]
+# the Postgres genre enum is created from member names, so only genres whose name equals their value are seeded
+GENRES = [g.value for g in Genre if g.name == g.value]
+
+
+def parse_size(value: str) -> int:
+    value = value.lower().replace("_", "")
+    multiplier = {"k": 1000, "m": 1000000}.get(value[-1], 1)
+    return int(float(value.rstrip("km")) * multiplier)
+
+
+def author_name(i: int) -> str:
+    name = f"{FIRST_NAMES[i % len(FIRST_NAMES)]} {LAST_NAMES[i // len(FIRST_NAMES) % len(LAST_NAMES)]}"
+    generation = i // (len(FIRST_NAMES) * len(LAST_NAMES))
+    return f"{name} {generation + 1}" if generation else name
+
+
+def generate_books(size: int, seed: int = SEED):
+    rng = random.Random(seed)
+    n_authors = max(100, size // 5)
+    for i in range(size):
+        form = rng.choice(TITLE_FORMS)
+        title = form.format(a=rng.choice(TITLE_WORDS).title(), b=rng.choice(TITLE_WORDS).title())
+        # most books have one author, a few have up to three; popular authors write many books
+        fan_out = 1 if rng.random() < 0.7 else (2 if rng.random() < 0.75 else 3)
+        authors = {author_name(int(n_authors * rng.random() ** 3)) for _ in range(fan_out)}
+        yield {
+            "title": f"{title} {i}",
+            "genre": rng.choice(GENRES),
+            "published_year": 1800 + int(225 * rng.random() ** 0.5),
+            "authors": sorted(authors),
+        }
+
+
+def summarize(samples: list) -> dict:
+    ms = sorted(s * 1000 for s in samples)
+    return {
+        "median_ms": round(ms[len(ms) // 2], 3),
+        "p95_ms": round(ms[max(0, -(-len(ms) * 95 // 100) - 1)], 3),
+        "min_ms": round(ms[0], 3),
+        "n": len(ms),
+    }
+
+
+async def timed(fn, repeat: int) -> dict:
+    await fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+async def count_books(engine) -> int:
+    async with engine.connect() as conn:
+        return (await conn.execute(text("SELECT COUNT(*) FROM books"))).scalar()
+
+
+async def prepare_catalog(engine, size: int, reset: bool) -> dict | None:
+    async with engine.begin() as conn:
+        if reset:
+            await conn.run_sync(models.Base.metadata.drop_all)
+        await conn.run_sync(models.Base.metadata.create_all)
+    existing = await count_books(engine)
+    if existing == size:
+        return None
+    if existing:
+        raise SystemExit(f"database already holds {existing} books, expected {size}; rerun with --reset")
+    started = time.perf_counter()
+    chunk = []
+    async with engine.connect() as conn:
+        for book in generate_books(size):
+            chunk.append(book)
+            if len(chunk) == SEED_CHUNK:
+                await book_service.bulk_create_books(conn, chunk)
+                chunk = []
+        if chunk:
+            await book_service.bulk_create_books(conn, chunk)
+        await conn.execute(text("ANALYZE"))
+        await conn.commit()
+    elapsed = time.perf_counter() - started
+    return {"rows": size, "seconds": round(elapsed, 3), "rows_per_s": round(size / elapsed, 1)}
+
+
+LIST_FILTERS = {
+    "none": {},
+    "title": {"title": "river"},
+    "author": {"author": "kowalski"},
+    "genre": {"genre": "Science"},
+    "years": {"year_from": 1950, "year_to": 1970},
+    "q": {"q": "harbor"},
+}
+
+
+async def bench_lists(conn, repeat: int) -> dict:
+    results = {}
+    for name, filters in LIST_FILTERS.items():
+        sorts = [(s, o) for s in ("title", "published_year") for o in ("asc", "desc")]
+        if "q" in filters:
+            sorts.append(("relevance", "asc"))
+        for sort_by, order in sorts:
+            async def call(filters=filters, sort_by=sort_by, order=order):
+                await book_service.get_books(conn, sort_by=sort_by, order=order, limit=20, **filters)
+            results[f"get_books[{name},{sort_by},{order}]"] = await timed(call, repeat)
+    return results
+
+
+async def bench_deep_pagination(conn, size: int, repeat: int) -> dict:
+    offset = size // 2
+    row = (await conn.execute(
+        text("SELECT title, id FROM books ORDER BY title, id LIMIT 1 OFFSET :n"), {"n": offset - 1}
+    )).first()
+
+    async def by_offset():
+        await book_service.get_books(conn, limit=20, offset=offset)
+
+    async def by_cursor():
+        await book_service.get_books(conn, limit=20, after=(row[0], row[1]))
+
+    return {
+        "get_books[deep_offset]": await timed(by_offset, repeat),
+        "get_books[deep_cursor]": await timed(by_cursor, repeat),
+    }
+
+
+async def bench_export(conn) -> dict:
+    started = time.perf_counter()
+    rows = 0
+    async for batch in book_service.iter_books(conn):
+        rows += len(batch)
+    elapsed = time.perf_counter() - started
+    return {"iter_books[export]": {"rows": rows, "seconds": round(elapsed, 3), "rows_per_s": round(rows / elapsed, 1)}}
+
+
+async def bench_bulk_create(conn, rows: int) -> dict:
+    books = list(generate_books(rows, seed=SEED + 1))
+    started = time.perf_counter()
+    created = await book_service.bulk_create_books(conn, books)
+    elapsed = time.perf_counter() - started
+    ids = [b["id"] for b in created]
+    for start in range(0, len(ids), 1000):
+        await book_service.delete_books(conn, ids[start:start + 1000])
+    return {"bulk_create_books": {"rows": rows, "seconds": round(elapsed, 3), "rows_per_s": round(rows / elapsed, 1)}}
+
+
+async def bench_crud(conn, repeat: int) -> dict:
+    samples: dict = {"create_book": [], "get_book_by_id": [], "update_book": [], "delete_book": []}
+    for i in range(repeat + 1):
+        timings = []
+        started = time.perf_counter()
+        book = await book_service.create_book(conn, f"Crud Bench {i}", GENRES[0], 2001, ["Crud Bench Author"])
+        timings.append(time.perf_counter() - started)
+        for call in (
+            lambda: book_service.get_book_by_id(conn, book["id"]),
+            lambda: book_service.update_book(conn, book["id"], {"title": f"Crud Bench {i} v2"}),
+            lambda: book_service.delete_book(conn, book["id"]),
+        ):
+            started = time.perf_counter()
+            await call()
+            timings.append(time.perf_counter() - started)
+        if i:
+            for name, seconds in zip(samples, timings):
+                samples[name].append(seconds)
+    return {name: summarize(values) for name, values in samples.items()}
+
+
+async def bench_stats(conn, repeat: int) -> dict:
+    return {
+        "get_book_stats[counters]": await timed(lambda: book_service.get_book_stats(conn), repeat),
+        "get_book_stats[exact]": await timed(lambda: book_service.get_book_stats(conn, exact=True), repeat),
+        "get_book_stats[genre]": await timed(lambda: book_service.get_book_stats(conn, genre="Science"), repeat),
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    for name, current in results["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if previous is None:
+            continue
+        if "median_ms" in current:
+            ratio = current["median_ms"] / previous["median_ms"] if previous["median_ms"] else 1.0
+            shown = f"{previous['median_ms']:10.3f} -> {current['median_ms']:10.3f} ms"
+        else:
+            ratio = previous["rows_per_s"] / current["rows_per_s"] if current["rows_per_s"] else float("inf")
+            shown = f"{previous['rows_per_s']:10.1f} -> {current['rows_per_s']:10.1f} rows/s"
+        verdict = "REGRESSION" if ratio > 1 + tolerance else ("improved" if ratio < 1 - tolerance else "ok")
+        if verdict == "REGRESSION":
+            regressions.append(name)
+        print(f"{name:<52} {shown}  x{ratio:5.2f}  {verdict}")
+    return regressions
+
+
+async def main(args) -> int:
+    size = parse_size(args.size)
+    url = args.database_url or f"sqlite+aiosqlite:///{os.path.join(tempfile.gettempdir(), f'bms-catalog-{size}.db')}"
+    cache.backend = NullCacheBackend()
+    engine = build_engine(url)
+    results: dict = {}
+    try:
+        seeding = await prepare_catalog(engine, size, args.reset)
+        if seeding:
+            results["seed[bulk_create_books]"] = seeding
+        async with engine.connect() as conn:
+            results.update(await bench_lists(conn, args.repeat))
+            results.update(await bench_deep_pagination(conn, size, args.repeat))
+            results.update(await bench_stats(conn, args.repeat))
+            results.update(await bench_crud(conn, args.repeat))
+            results.update(await bench_bulk_create(conn, args.bulk_rows))
+            results.update(await bench_export(conn))
+    finally:
+        await engine.dispose()
+
+    report = {
+        "meta": {
+            "size": size,
+            "dialect": engine.dialect.name,
+            "repeat": args.repeat,
+            "seed": SEED,
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {len(results)} results to {args.output}")
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    for key in ("size", "dialect"):
+        if baseline.get("meta", {}).get(key) != report["meta"][key]:
+            print(f"warning: baseline {key} is {baseline.get('meta', {}).get(key)!r}, this run is {report['meta'][key]!r}")
+    regressions = compare(report, baseline, args.tolerance)
+    print(f"{len(regressions)} regressions beyond {args.tolerance:.0%}")
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", default="10k", help="catalog size, e.g. 10k, 100k, 1m")
+    parser.add_argument("--database-url", help="defaults to a reusable SQLite file in the temp directory")
+    parser.add_argument("--reset", action="store_true", help="drop and reseed the catalog")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--bulk-rows", type=int, default=5000)
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--baseline", help="results JSON of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="relative slowdown reported as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    sys.exit(asyncio.run(main(parser.parse_args())))
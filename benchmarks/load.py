@@ -0,0 +1,308 @@
+"""HTTP load generator for the API with configurable traffic mixes.
+
+    python -m benchmarks.load [--mix mixed | list=50,get=40,write=10] [--concurrency 32]
+                              [--duration 20] [--size 2k] [--url http://localhost:8000] [--output load.json]
+
+Without ``--url`` the app runs in-process through httpx's ASGI transport on a temporary SQLite
+file (or ``--database-url``), so no server or external services are needed, and the per-client
+rate limit is switched off unless ``--keep-rate-limit`` is given. Operations: ``list`` (filtered
+GET /books/), ``get`` (GET /books/{id}), ``write`` (authenticated create/update/delete),
+``import`` (POST /books/import) and ``export`` (GET /books/export).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from collections import Counter, defaultdict
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+os.environ.setdefault("JWT_SECRET", "benchmark")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+os.environ.setdefault("JWT_EXPIRATION", "3600")
+
+from httpx import AsyncClient, ASGITransport  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+from app import models  # noqa: E402
+from app.db import build_engine, get_conn, get_read_conn, get_read_connector  # noqa: E402
+from app.limiter import limiter  # noqa: E402
+from app.main import app  # noqa: E402
+from benchmarks.catalog import generate_books, parse_size, GENRES, TITLE_WORDS, LAST_NAMES  # noqa: E402
+
+MIXES = {
+    "browse": {"list": 45, "get": 45, "write": 8, "export": 2},
+    "mixed": {"list": 35, "get": 35, "write": 20, "import": 5, "export": 5},
+    "write-heavy": {"list": 20, "get": 20, "write": 50, "import": 10},
+}
+IMPORT_ROWS = 20
+
+
+def parse_mix(value: str) -> dict:
+    if value in MIXES:
+        return MIXES[value]
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in OPERATIONS:
+            raise SystemExit(f"unknown operation {name!r}, expected one of {', '.join(OPERATIONS)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def percentile(sorted_values: list, p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, -(-len(sorted_values) * p // 100) - 1))]
+
+
+class Run:
+    def __init__(self, client: AsyncClient, book_ids: list, tokens: list):
+        self.client = client
+        self.book_ids = book_ids
+        self.tokens = tokens
+        self.created: list = []
+        self.latencies: dict = defaultdict(list)
+        self.statuses: dict = defaultdict(Counter)
+        self.import_seq = 0
+
+    def auth(self, rng: random.Random) -> dict:
+        return {"Authorization": f"Bearer {rng.choice(self.tokens)}"}
+
+    def record(self, label: str, seconds: float, status):
+        self.latencies[label].append(seconds)
+        self.statuses[label][status] += 1
+
+
+async def op_list(run: Run, rng: random.Random):
+    params = {"limit": rng.choice([10, 20, 50]), "sort_by": rng.choice(["title", "published_year"])}
+    choice = rng.random()
+    if choice < 0.25:
+        params["genre"] = rng.choice(GENRES)
+    elif choice < 0.45:
+        params["title"] = rng.choice(TITLE_WORDS)
+    elif choice < 0.6:
+        params["author"] = rng.choice(LAST_NAMES).lower()
+    elif choice < 0.75:
+        params["q"] = rng.choice(TITLE_WORDS)
+    elif choice < 0.85:
+        params["year_from"] = rng.randint(1800, 2000)
+    resp = await run.client.get("/books/", params=params)
+    return "list", resp.status_code
+
+
+async def op_get(run: Run, rng: random.Random):
+    resp = await run.client.get(f"/books/{rng.choice(run.book_ids)}")
+    return "get", resp.status_code
+
+
+async def op_write(run: Run, rng: random.Random):
+    choice = rng.random()
+    if len(run.created) < 10 or choice < 0.5:
+        book = next(generate_books(1, seed=rng.randrange(1 << 30)))
+        resp = await run.client.post("/books/", json=book, headers=run.auth(rng))
+        if resp.status_code == 201:
+            run.created.append(resp.json()["id"])
+        return "write:create", resp.status_code
+    if choice < 0.85:
+        book_id = rng.choice(run.created)
+        resp = await run.client.put(
+            f"/books/{book_id}", json={"title": f"Load Update {rng.random():.6f}"}, headers=run.auth(rng)
+        )
+        return "write:update", resp.status_code
+    book_id = run.created.pop(rng.randrange(len(run.created)))
+    resp = await run.client.delete(f"/books/{book_id}", headers=run.auth(rng))
+    return "write:delete", resp.status_code
+
+
+async def op_import(run: Run, rng: random.Random):
+    run.import_seq += 1
+    books = list(generate_books(IMPORT_ROWS, seed=rng.randrange(1 << 30)))
+    for book in books:
+        book["title"] = f"{book['title']} import {run.import_seq}"
+    resp = await run.client.post(
+        "/books/import", params={"stream": "true"}, headers=run.auth(rng),
+        files={"file": ("books.json", json.dumps(books).encode("utf-8"), "application/json")},
+    )
+    return "import", resp.status_code
+
+
+async def op_export(run: Run, rng: random.Random):
+    async with run.client.stream("GET", "/books/export", params={"format": rng.choice(["json", "csv"])}) as resp:
+        async for _ in resp.aiter_bytes():
+            pass
+    return "export", resp.status_code
+
+
+OPERATIONS = {"list": op_list, "get": op_get, "write": op_write, "import": op_import, "export": op_export}
+
+
+async def worker(run: Run, mix: dict, deadline: float, rng: random.Random):
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        started = time.perf_counter()
+        try:
+            label, status = await OPERATIONS[name](run, rng)
+        except Exception as e:
+            label, status = name, type(e).__name__
+        run.record(label, time.perf_counter() - started, status)
+
+
+async def watch_loop_lag(stop: asyncio.Event, samples: list, interval: float = 0.01):
+    # a blocked event loop shows up as sleeps that overshoot their interval
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, time.perf_counter() - started - interval))
+
+
+async def seed(client: AsyncClient, size: int, users: int) -> tuple[list, list]:
+    tokens = []
+    for i in range(users):
+        username = f"load_{i}_{time.monotonic_ns()}"
+        resp = await client.post("/auth/register", json={
+            "username": username, "password": "secret123", "email": f"{username}@example.com"
+        })
+        resp.raise_for_status()
+        tokens.append(resp.json()["access_token"])
+    headers = {"Authorization": f"Bearer {tokens[0]}"}
+    books = list(generate_books(size))
+    for start in range(0, size, 5000):
+        chunk = json.dumps(books[start:start + 5000]).encode("utf-8")
+        resp = await client.post(
+            "/books/import", params={"stream": "true"}, headers=headers,
+            files={"file": ("books.json", chunk, "application/json")}
+        )
+        resp.raise_for_status()
+    resp = await client.get("/books/export", params={"format": "json"})
+    resp.raise_for_status()
+    return [b["id"] for b in resp.json()], tokens
+
+
+def report(run: Run, elapsed: float, lag: list) -> dict:
+    operations = {}
+    total = errors = 0
+    for label in sorted(run.latencies):
+        ms = sorted(s * 1000 for s in run.latencies[label])
+        statuses = run.statuses[label]
+        failed = sum(n for status, n in statuses.items() if not isinstance(status, int) or status >= 400)
+        total += len(ms)
+        errors += failed
+        operations[label] = {
+            "requests": len(ms),
+            "rps": round(len(ms) / elapsed, 1),
+            "error_rate": round(failed / len(ms), 4),
+            "p50_ms": round(percentile(ms, 50), 2),
+            "p95_ms": round(percentile(ms, 95), 2),
+            "p99_ms": round(percentile(ms, 99), 2),
+            "max_ms": round(ms[-1], 2),
+            "statuses": {str(k): v for k, v in statuses.items()},
+        }
+    lag_ms = sorted(s * 1000 for s in lag)
+    return {
+        "duration_s": round(elapsed, 2),
+        "requests": total,
+        "rps": round(total / elapsed, 1),
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "loop_lag_ms": {
+            "p50": round(percentile(lag_ms, 50), 2),
+            "p99": round(percentile(lag_ms, 99), 2),
+            "max": round(lag_ms[-1], 2) if lag_ms else 0.0,
+        },
+        "operations": operations,
+    }
+
+
+def print_report(result: dict):
+    print(f"{'operation':<14} {'reqs':>7} {'req/s':>8} {'err%':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    for label, op in result["operations"].items():
+        print(
+            f"{label:<14} {op['requests']:>7} {op['rps']:>8.1f} {op['error_rate'] * 100:>6.2f} "
+            f"{op['p50_ms']:>8.2f} {op['p95_ms']:>8.2f} {op['p99_ms']:>8.2f} {op['max_ms']:>8.2f}"
+        )
+    lag = result["loop_lag_ms"]
+    print(
+        f"total {result['requests']} requests in {result['duration_s']}s = {result['rps']} req/s, "
+        f"error rate {result['error_rate']:.2%}, event-loop lag p50 {lag['p50']}ms p99 {lag['p99']}ms max {lag['max']}ms"
+    )
+
+
+async def main(args) -> dict:
+    mix = parse_mix(args.mix)
+    engine = None
+    db_dir = None
+    if args.url:
+        client = AsyncClient(base_url=args.url, timeout=60)
+    else:
+        if args.database_url:
+            url = args.database_url
+        else:
+            db_dir = tempfile.TemporaryDirectory()
+            url = f"sqlite+aiosqlite:///{db_dir.name}/load.db"
+        engine = build_engine(url)
+        async with engine.begin() as conn:
+            await conn.run_sync(models.Base.metadata.create_all)
+            if engine.dialect.name == "sqlite":
+                # readers and the single writer stop blocking each other
+                await conn.execute(text("PRAGMA journal_mode=WAL"))
+
+        async def load_conn():
+            async with engine.connect() as conn:
+                yield conn
+
+        app.dependency_overrides[get_conn] = load_conn
+        app.dependency_overrides[get_read_conn] = load_conn
+        app.dependency_overrides[get_read_connector] = lambda: engine.connect
+        limiter.enabled = args.keep_rate_limit
+        client = AsyncClient(transport=ASGITransport(app=app), base_url="http://load", timeout=60)
+
+    try:
+        async with client:
+            book_ids, tokens = await seed(client, parse_size(args.size), args.users)
+            run = Run(client, book_ids, tokens)
+            lag: list = []
+            stop = asyncio.Event()
+            watcher = asyncio.create_task(watch_loop_lag(stop, lag))
+            started = time.perf_counter()
+            deadline = started + args.duration
+            await asyncio.gather(*(
+                worker(run, mix, deadline, random.Random(args.seed + i)) for i in range(args.concurrency)
+            ))
+            elapsed = time.perf_counter() - started
+            stop.set()
+            await watcher
+    finally:
+        if engine is not None:
+            await engine.dispose()
+        if db_dir is not None:
+            db_dir.cleanup()
+
+    result = report(run, elapsed, lag)
+    result["config"] = {
+        "mix": mix, "concurrency": args.concurrency, "size": parse_size(args.size),
+        "target": args.url or "in-process", "rate_limit": bool(args.url or args.keep_rate_limit),
+    }
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mix", default="mixed", help=f"preset ({', '.join(MIXES)}) or op=weight,...")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of load after seeding")
+    parser.add_argument("--size", default="2k", help="books seeded before the run")
+    parser.add_argument("--users", type=int, default=4, help="accounts registered for authenticated operations")
+    parser.add_argument("--url", help="drive a running server instead of the in-process app")
+    parser.add_argument("--database-url", help="in-process only; defaults to a temporary SQLite file")
+    parser.add_argument("--keep-rate-limit", action="store_true")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="also write the report as JSON")
+    args = parser.parse_args()
+    result = asyncio.run(main(args))
+    print_report(result)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,125 @@
+"""Response serialization: validated BookOut path vs the fast path, for list pages and single books.
+
+    python -m benchmarks.serialization [--size 2k] [--repeat 300] [--output serialization.json]
+
+"encode" times only turning service rows into response bytes: the validated path builds BookOut models and
+lets a TypeAdapter validate and dump them again, as FastAPI does for ``response_model``; the fast path builds
+plain dicts and encodes them directly. "http" times whole in-process requests with ``fast_responses`` off and on.
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from typing import List
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+os.environ.setdefault("JWT_SECRET", "benchmark")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+os.environ.setdefault("JWT_EXPIRATION", "3600")
+
+from httpx import AsyncClient, ASGITransport  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from app import serialization  # noqa: E402
+from app.config import settings  # noqa: E402
+from app.db import build_engine, get_conn, get_read_conn  # noqa: E402
+from app.limiter import limiter  # noqa: E402
+from app.main import app  # noqa: E402
+from app.routers.books import book_to_dict, book_to_out  # noqa: E402
+from app.schemas.book_schema import BookOut  # noqa: E402
+from app.services import book_service  # noqa: E402
+from benchmarks.catalog import parse_size, prepare_catalog, summarize, timed  # noqa: E402
+
+PAGE = 50
+
+
+async def bench_encode(page: list, book: dict, repeat: int) -> dict:
+    list_adapter = TypeAdapter(List[BookOut])
+    book_adapter = TypeAdapter(BookOut)
+
+    async def validated_list():
+        list_adapter.dump_json(list_adapter.validate_python([book_to_out(b) for b in page], from_attributes=True))
+
+    async def fast_list():
+        serialization.dumps([book_to_dict(b) for b in page])
+
+    async def validated_book():
+        book_adapter.dump_json(book_adapter.validate_python(book_to_out(book), from_attributes=True))
+
+    async def fast_book():
+        serialization.dumps(book_to_dict(book))
+
+    return {
+        f"list_{PAGE}": {"validated": await timed(validated_list, repeat), "fast": await timed(fast_list, repeat)},
+        "book": {"validated": await timed(validated_book, repeat), "fast": await timed(fast_book, repeat)},
+    }
+
+
+async def bench_http(client: AsyncClient, book_id: int, repeat: int) -> dict:
+    requests = {f"list_{PAGE}": ("/books/", {"limit": PAGE}), "book": (f"/books/{book_id}", None)}
+    samples = {case: {"validated": [], "fast": []} for case in requests}
+    # modes alternate request by request so that drift in the process affects both alike
+    for i in range(repeat + 1):
+        for case, (path, params) in requests.items():
+            for mode, fast in (("validated", False), ("fast", True)):
+                settings.fast_responses = fast
+                started = time.perf_counter()
+                (await client.get(path, params=params)).raise_for_status()
+                if i:
+                    samples[case][mode].append(time.perf_counter() - started)
+    return {case: {mode: summarize(s) for mode, s in modes.items()} for case, modes in samples.items()}
+
+
+def speedups(results: dict) -> dict:
+    return {
+        f"{level}.{case}": round(modes["validated"]["median_ms"] / modes["fast"]["median_ms"], 2)
+        for level, cases in results.items() for case, modes in cases.items()
+    }
+
+
+async def main(args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_engine(f"sqlite+aiosqlite:///{tmp}/serialization.db")
+        await prepare_catalog(engine, parse_size(args.size), reset=True)
+        async with engine.connect() as conn:
+            page = await book_service.get_books(conn, limit=PAGE)
+            book = await book_service.get_book_by_id(conn, page[0]["id"])
+
+        async def bench_conn():
+            async with engine.connect() as conn:
+                yield conn
+
+        app.dependency_overrides[get_conn] = bench_conn
+        app.dependency_overrides[get_read_conn] = bench_conn
+        limiter.enabled = False
+        try:
+            results = {"encode": await bench_encode(page, book, args.repeat)}
+            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+                results["http"] = await bench_http(client, book["id"], args.repeat)
+        finally:
+            await engine.dispose()
+    return {
+        "encoder": "orjson" if serialization.orjson is not None else "json",
+        "results": results,
+        "speedup": speedups(results),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", default="2k", help="books in the catalog")
+    parser.add_argument("--repeat", type=int, default=300)
+    parser.add_argument("--output", help="also write the results as JSON")
+    args = parser.parse_args()
+    report = asyncio.run(main(args))
+    print(f"encoder: {report['encoder']}")
+    for level, cases in report["results"].items():
+        for case, modes in cases.items():
+            print(
+                f"{level:<7} {case:<8} validated {modes['validated']['median_ms']:>8.3f}ms  "
+                f"fast {modes['fast']['median_ms']:>8.3f}ms  x{report['speedup'][f'{level}.{case}']}"
+            )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
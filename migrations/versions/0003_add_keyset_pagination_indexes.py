@@ -0,0 +1,25 @@
+"""add (sort column, id) indexes for keyset pagination
+
+Revision ID: 0003_add_keyset_pagination_indexes
+Revises: 0002_add_unique_constraints
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+from typing import Union, Sequence
+
+# revision identifiers, used by Alembic.
+revision = "0003_add_keyset_pagination_indexes"
+down_revision: Union[str, Sequence[str], None] = "0002_add_unique_constraints"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_books_title_id", "books", ["title", "id"])
+    op.create_index("ix_books_published_year_id", "books", ["published_year", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_books_published_year_id", table_name="books")
+    op.drop_index("ix_books_title_id", table_name="books")
@@ -0,0 +1,61 @@
+"""add full-text and trigram search for books
+
+Revision ID: 0004_add_book_search
+Revises: 0003_add_keyset_pagination_indexes
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from typing import Union, Sequence
+
+# revision identifiers, used by Alembic.
+revision = "0004_add_book_search"
+down_revision: Union[str, Sequence[str], None] = "0003_add_keyset_pagination_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == "sqlite":
+        # never filled on SQLite, which searches books_fts instead; it keeps the schema equal to the model's
+        op.add_column("books", sa.Column("search_vector", sa.Text(), nullable=True))
+        op.execute("CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(title, authors)")
+        op.execute(
+            "INSERT INTO books_fts (rowid, title, authors) "
+            "SELECT b.id, b.title, COALESCE((SELECT group_concat(a.name, ' ') FROM book_authors ba "
+            "JOIN authors a ON a.id = ba.author_id WHERE ba.book_id = b.id), '') FROM books b"
+        )
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.add_column("books", sa.Column("search_vector", postgresql.TSVECTOR(), nullable=True))
+    op.execute(
+        "UPDATE books b SET search_vector = "
+        "setweight(to_tsvector('simple', b.title), 'A') || "
+        "setweight(to_tsvector('simple', COALESCE((SELECT string_agg(a.name, ' ') FROM book_authors ba "
+        "JOIN authors a ON a.id = ba.author_id WHERE ba.book_id = b.id), '')), 'B')"
+    )
+    op.create_index("ix_books_search_vector", "books", ["search_vector"], postgresql_using="gin")
+    op.create_index(
+        "ix_books_title_trgm", "books", ["title"],
+        postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}
+    )
+    op.create_index(
+        "ix_authors_name_trgm", "authors", ["name"],
+        postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "sqlite":
+        op.execute("DROP TABLE IF EXISTS books_fts")
+        with op.batch_alter_table("books") as batch_op:
+            batch_op.drop_column("search_vector")
+        return
+
+    op.drop_index("ix_authors_name_trgm", table_name="authors")
+    op.drop_index("ix_books_title_trgm", table_name="books")
+    op.drop_index("ix_books_search_vector", table_name="books")
+    op.drop_column("books", "search_vector")
@@ -0,0 +1,38 @@
+"""add book version/updated_at and the catalog generation counter
+
+Revision ID: 0005_add_book_versions
+Revises: 0004_add_book_search
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from typing import Union, Sequence
+
+# revision identifiers, used by Alembic.
+revision = "0005_add_book_versions"
+down_revision: Union[str, Sequence[str], None] = "0004_add_book_search"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("books") as batch_op:
+        batch_op.add_column(sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+        batch_op.add_column(
+            sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now())
+        )
+    op.create_table(
+        "catalog_state",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("generation", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+    op.execute("INSERT INTO catalog_state (id, generation) VALUES (1, 1)")
+
+
+def downgrade() -> None:
+    op.drop_table("catalog_state")
+    with op.batch_alter_table("books") as batch_op:
+        batch_op.drop_column("updated_at")
+        batch_op.drop_column("version")
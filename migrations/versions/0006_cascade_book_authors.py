@@ -0,0 +1,46 @@
+"""delete book_authors rows together with their book
+
+Revision ID: 0006_cascade_book_authors
+Revises: 0005_add_book_versions
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from typing import Union, Sequence
+
+# revision identifiers, used by Alembic.
+revision = "0006_cascade_book_authors"
+down_revision: Union[str, Sequence[str], None] = "0005_add_book_versions"
+branch_labels = None
+depends_on = None
+
+
+def _book_authors_table(ondelete: str | None) -> sa.Table:
+    return sa.Table(
+        "book_authors",
+        sa.MetaData(),
+        sa.Column("book_id", sa.Integer(), sa.ForeignKey("books.id", ondelete=ondelete), primary_key=True),
+        sa.Column("author_id", sa.Integer(), sa.ForeignKey("authors.id"), primary_key=True),
+        sa.UniqueConstraint("book_id", "author_id", name="uq_book_authors_pair"),
+    )
+
+
+def _set_book_fk(ondelete: str | None) -> None:
+    if op.get_bind().dialect.name == "sqlite":
+        # SQLite cannot alter a constraint in place, the table is rebuilt from the target definition
+        with op.batch_alter_table("book_authors", copy_from=_book_authors_table(ondelete), recreate="always"):
+            pass
+        return
+    op.drop_constraint("book_authors_book_id_fkey", "book_authors", type_="foreignkey")
+    op.create_foreign_key(
+        "book_authors_book_id_fkey", "book_authors", "books", ["book_id"], ["id"], ondelete=ondelete
+    )
+
+
+def upgrade() -> None:
+    _set_book_fk("CASCADE")
+
+
+def downgrade() -> None:
+    _set_book_fk(None)
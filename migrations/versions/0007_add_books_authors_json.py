@@ -0,0 +1,26 @@
+"""add the denormalized author list on books
+
+Revision ID: 0007_add_books_authors_json
+Revises: 0006_cascade_book_authors
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from typing import Union, Sequence
+
+# revision identifiers, used by Alembic.
+revision = "0007_add_books_authors_json"
+down_revision: Union[str, Sequence[str], None] = "0006_cascade_book_authors"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # nullable, so adding it is instant; reads fall back to the join until `python -m app.manage backfill-authors`
+    op.add_column("books", sa.Column("authors_json", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("books") as batch_op:
+        batch_op.drop_column("authors_json")
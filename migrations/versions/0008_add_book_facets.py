@@ -0,0 +1,38 @@
+"""add incrementally maintained book facet counters
+
+Revision ID: 0008_add_book_facets
+Revises: 0007_add_books_authors_json
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from typing import Union, Sequence
+
+# revision identifiers, used by Alembic.
+revision = "0008_add_book_facets"
+down_revision: Union[str, Sequence[str], None] = "0007_add_books_authors_json"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "book_facets",
+        sa.Column("facet", sa.String(), primary_key=True),
+        sa.Column("value", sa.String(), primary_key=True),
+        sa.Column("count", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.create_index("ix_book_facets_facet_count", "book_facets", ["facet", "count"])
+    op.execute(
+        "INSERT INTO book_facets (facet, value, count) "
+        "SELECT 'genre', CAST(genre AS TEXT), COUNT(*) FROM books GROUP BY genre "
+        "UNION ALL SELECT 'decade', CAST(published_year / 10 * 10 AS TEXT), COUNT(*) FROM books "
+        "GROUP BY published_year / 10 * 10 "
+        "UNION ALL SELECT 'author', CAST(author_id AS TEXT), COUNT(*) FROM book_authors GROUP BY author_id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_book_facets_facet_count", table_name="book_facets")
+    op.drop_table("book_facets")